@@ -0,0 +1,180 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ranges import ExpenseRanges
+
+
+def _week_start(days):
+    # 1970-01-01 was a Thursday, so Monday-based weekdays are (days + 3) % 7
+    dates = np.asarray(days, dtype=np.int64).view("datetime64[D]")
+    return (dates - ((dates.view(np.int64) + 3) % 7).astype("timedelta64[D]")).view(np.int64)
+
+
+def _month_start(days):
+    dates = np.asarray(days, dtype=np.int64).view("datetime64[D]")
+    return dates.astype("datetime64[M]").astype("datetime64[D]").view(np.int64)
+
+
+# Coarser date grains rolled up next to the per-day sums. Each maps day numbers (days
+# since the epoch, scalar or array) to the day number of the period's first day; NaT stays NaT.
+DATE_ROLLUPS = {
+    "Week": _week_start,
+    "Month": _month_start,
+}
+
+# Grouping columns the ledger stores as dense dictionary codes; their sums and counts are
+# arrays indexed by code instead of a dict entry per group
+CODED_DIMENSIONS = ("Category", "Currency")
+
+
+class ExpenseAggregates:
+    """Running totals of the ledger's Amount column, in integer cents.
+
+    Keeps the grand total plus a sum and row count per value of each grouping
+    column (Category, Date, Currency), updated in O(1) per added or removed
+    expense so charts, the balance section and reports never have to rescan
+    the ledger. When Date is a dimension, per-week and per-month sums
+    (DATE_ROLLUPS) are maintained the same way, and with a Category dimension
+    too, ``ranges`` (ExpenseRanges) answers totals over any date range.
+
+    Keys are the ledger's storage values (category codes, day numbers);
+    ``decoders`` maps a dimension to a function ``(name, keys)`` turning an
+    array of keys back into display values when totals are read. Category and
+    currency sums (CODED_DIMENSIONS) sit in arrays indexed by code, 16 bytes
+    per category, since the finance app's ledger has one category per expense.
+    """
+
+    def __init__(self, dimensions=("Category", "Date"), decoders=None):
+        self.dimensions = tuple(dimensions)
+        self.total_cents = 0
+        self.count = 0
+        self._decoders = decoders or {}
+        self._rollups = tuple(DATE_ROLLUPS) if "Date" in self.dimensions else ()
+        self._coded = {name: np.zeros((2, 64), dtype=np.int64) for name in self.dimensions if name in CODED_DIMENSIONS}
+        self._groups = {name: {} for name in self.dimensions + self._rollups if name not in self._coded}
+        dated = {"Category", "Date"} <= set(self.dimensions)
+        self.ranges = ExpenseRanges(decode=self._decode) if dated else None
+
+    @property
+    def total(self):
+        return self.total_cents / 100
+
+    def _with_rollups(self, keys):
+        if self._rollups:
+            keys = dict(keys, **{name: int(DATE_ROLLUPS[name](keys["Date"])) for name in self._rollups})
+        return keys
+
+    def _code_sums(self, name, needed):
+        # (sums, counts) array of a coded dimension, grown by doubling to hold codes below ``needed``
+        sums = self._coded[name]
+        if needed > sums.shape[1]:
+            grown = np.zeros((2, max(needed, 2 * sums.shape[1])), dtype=np.int64)
+            grown[:, :sums.shape[1]] = sums
+            sums = self._coded[name] = grown
+        return sums
+
+    def add(self, cents, **keys):
+        self.total_cents += cents
+        self.count += 1
+        for name in self._coded:
+            sums = self._code_sums(name, keys[name] + 1)
+            sums[0, keys[name]] += cents
+            sums[1, keys[name]] += 1
+        if self.ranges is not None:
+            self.ranges.add(cents, keys["Category"], keys["Date"])
+        keys = self._with_rollups(keys)
+        for name in self._groups:
+            group = self._groups[name]
+            entry = group.get(keys[name])
+            if entry is None:
+                group[keys[name]] = [cents, 1]
+            else:
+                entry[0] += cents
+                entry[1] += 1
+
+    def remove(self, cents, **keys):
+        # Sums are integer cents, so removing an expense restores them exactly
+        self.total_cents -= cents
+        self.count -= 1
+        for name, sums in self._coded.items():
+            sums[0, keys[name]] -= cents
+            sums[1, keys[name]] -= 1
+        if self.ranges is not None:
+            self.ranges.remove(cents, keys["Category"], keys["Date"])
+        keys = self._with_rollups(keys)
+        for name in self._groups:
+            group = self._groups[name]
+            entry = group[keys[name]]
+            entry[0] -= cents
+            entry[1] -= 1
+            if not entry[1]:
+                del group[keys[name]]
+
+    def add_many(self, cents, **keys):
+        # Bulk variant of add(): one groupby over the batch, then merge per group
+        if self.ranges is not None:
+            self.ranges.add_many(cents, keys["Category"], keys["Date"])
+        for name in self._coded:
+            codes = np.asarray(keys[name], dtype=np.int64)
+            if len(codes):
+                sums = self._code_sums(name, int(codes.max()) + 1)
+                np.add.at(sums[0], codes, np.asarray(cents, dtype=np.int64))
+                np.add.at(sums[1], codes, 1)
+        batch = pd.DataFrame({"Amount": cents, **{name: keys[name] for name in keys if name not in self._coded}})
+        for name in self._rollups:
+            batch[name] = DATE_ROLLUPS[name](batch["Date"].to_numpy())
+        self.total_cents += int(batch["Amount"].sum())
+        self.count += len(batch)
+        for name in self._groups:
+            group = self._groups[name]
+            sums = batch.groupby(name, sort=False)["Amount"].agg(["sum", "size"])
+            for key, amount, size in zip(sums.index.tolist(), sums["sum"].tolist(), sums["size"].tolist()):
+                entry = group.get(key)
+                if entry is None:
+                    group[key] = [amount, size]
+                else:
+                    entry[0] += amount
+                    entry[1] += size
+
+    def memory_usage(self):
+        """Bytes held by the per-group sums and the range index."""
+        usage = {"groups": sum(sums.nbytes for sums in self._coded.values()) + sum(sys.getsizeof(group) + sum(sys.getsizeof(key) + sys.getsizeof(entry)
+                                                           + sum(sys.getsizeof(value) for value in entry)
+                                                           for key, entry in group.items())
+                               for group in self._groups.values())}
+        if self.ranges is not None:
+            usage["ranges"] = self.ranges.nbytes
+        return usage
+
+    def _decode(self, name, keys):
+        decoder = self._decoders.get("Date" if name in self._rollups else name)
+        return decoder(name, keys) if decoder is not None else keys
+
+    def _keys_and_cents(self, name):
+        # Keys of the groups holding expenses (zero-amount ones included) and their sums
+        if name in self._coded:
+            sums = self._coded[name]
+            keys = np.flatnonzero(sums[1])
+            return keys, sums[0, keys]
+        group = self._groups[name]
+        keys = np.fromiter(group, dtype=np.int64, count=len(group))
+        return keys, np.fromiter((entry[0] for entry in group.values()), dtype=np.int64, count=len(group))
+
+    def keys(self, name):
+        # Distinct values of a grouping column, without building a Series
+        return set(np.asarray(self._decode(name, self._keys_and_cents(name)[0])).tolist())
+
+    def totals(self, name):
+        # Per-group sums as a Series indexed by the grouping column, sorted by key
+        keys, cents = self._keys_and_cents(name)
+        index = pd.Index(self._decode(name, keys), name=name)
+        return pd.Series(cents / 100, index=index, name="Amount", dtype="float64").sort_index()
+
+    def category_totals(self):
+        return self.totals("Category")
+
+    def date_totals(self, granularity="Date"):
+        # Per-day sums, or per-week / per-month sums with granularity "Week" / "Month"
+        return self.totals(granularity).rename_axis("Date")
@@ -0,0 +1,175 @@
+"""Render PDF reports and exports for many expense databases, without Streamlit.
+
+    python batch_reports.py ledgers/*.db --out-dir reports
+        [--app personal_finance_manager] [--income 5000] [--currency USD]
+        [--detail rows|category|month] [--month 2024-05] [--formats CSV Parquet]
+        [--workers 8] [--output timings.json]
+
+Every database (as written by ExpenseStore) is one job: load the ledger,
+convert it into the reporting currency, draw the PDF charts with the app's
+generate_pdfvisualizations, build the report with its create_pdf_report and
+write each requested export. Matplotlib rendering and ReportLab layout are
+CPU-bound and hold the GIL, so jobs run on a process pool, one ledger per
+task. Outputs go to ``<out-dir>/<database name>.<extension>``. Databases
+are opened read-only, so a mistyped path fails its job instead of creating
+an empty database, and a ledger or month without expenses still gets its
+report.
+
+Per-job timings (load, charts, PDF, exports) and overall throughput are
+printed as jobs finish; ``--output`` also writes them as JSON. The run exits
+non-zero if any job failed.
+"""
+import argparse
+import concurrent.futures
+import functools
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+
+from currency import BASE_CURRENCY, RATES_PATH, RateTable, reporting_period, reporting_view
+from expense_store import ExpenseStore
+from exporter import EXPORT_FORMATS, write_export
+from figure_cache import render_pngs
+from ledger import ExpenseLedger
+from pdf_report import REPORT_DETAILS
+from ranges import month_range
+
+# Ledger layout of each app: (columns, key)
+APP_LEDGERS = {
+    "finance_manager": (["Category", "Amount", "Currency"], ["Category"]),
+    "personal_finance_manager": (["Category", "Amount", "Currency", "Date"], ["Category", "Date"]),
+}
+
+
+def _init_worker():
+    # Workers draw off-screen, and the app modules' Streamlit calls run in bare mode
+    import matplotlib
+
+    matplotlib.use("Agg")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+@functools.lru_cache(maxsize=None)
+def _rates(path):
+    return RateTable.load(path)
+
+
+def render_job(app, db_path, out_dir, income, incurrency, detail, formats, month=None, rates_path=RATES_PATH):
+    """Write the PDF report and exports of one database; returns its timings and outputs."""
+    module = importlib.import_module(app)
+    timings = {}
+    start = time.perf_counter()
+
+    columns, key = APP_LEDGERS[app]
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"No such database: {db_path}")
+    store = ExpenseStore(db_path, readonly=True)
+    try:
+        ledger = store.load(ExpenseLedger(columns=columns, key=key))
+    finally:
+        store.close()
+    expense_df, total_expenses, category_amounts, _ = reporting_view(
+        ledger, _rates(rates_path), incurrency, sort_by="Date" if "Date" in columns else None)
+    if month is not None:
+        # One calendar month: a slice of the date-sorted view, summed from the ledger's range index
+        expense_df, total_expenses, category_amounts = reporting_period(ledger, expense_df, incurrency, *month_range(month))
+        expense_df = expense_df.reset_index(drop=True)
+    total_balance = income - total_expenses
+    timings["load"] = time.perf_counter() - start
+
+    name = os.path.splitext(os.path.basename(db_path))[0] + (f"-{month}" if month else "")
+    outputs = []
+    stage = time.perf_counter()
+    bar_chart_png, pie_chart_png = render_pngs(*module.generate_pdfvisualizations(
+        expense_df, income, total_expenses, total_balance, category_amounts))
+    timings["charts"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    pdf_path = os.path.join(out_dir, f"{name}.pdf")
+    module.create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_png, pie_chart_png,
+                             incurrency, detail, output_path=pdf_path)
+    outputs.append(pdf_path)
+    timings["pdf"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    for export_format in formats:
+        export_path = os.path.join(out_dir, f"{name}.{EXPORT_FORMATS[export_format][0]}")
+        with open(export_path, "wb") as f:
+            write_export(expense_df, export_format, f)
+        outputs.append(export_path)
+    timings["exports"] = time.perf_counter() - stage
+
+    timings["total"] = time.perf_counter() - start
+    return {"database": db_path, "rows": len(expense_df), "outputs": outputs, "timings": timings}
+
+
+def run_batch(app, db_paths, out_dir, income, incurrency, detail, formats, month=None, workers=None,
+              rates_path=RATES_PATH):
+    # Fan the jobs out over a process pool; yields each job's result (or error) as it finishes
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(render_job, app, db_path, out_dir, income, incurrency, detail, formats, month, rates_path): db_path
+            for db_path in db_paths
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as error:
+                yield {"database": futures[future], "error": f"{type(error).__name__}: {error}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("databases", nargs="+", help="expense databases written by the apps")
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--app", default="personal_finance_manager", choices=list(APP_LEDGERS))
+    parser.add_argument("--income", type=float, default=0.0)
+    parser.add_argument("--currency", default=BASE_CURRENCY, help="reporting currency")
+    parser.add_argument("--detail", default="rows", choices=list(REPORT_DETAILS.values()))
+    parser.add_argument("--month", help="only report expenses of this month (YYYY-MM); dated ledgers only")
+    parser.add_argument("--formats", nargs="*", default=[], choices=list(EXPORT_FORMATS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--rates", default=RATES_PATH, help="exchange rate CSV")
+    parser.add_argument("--output", help="write per-job timings JSON here")
+    args = parser.parse_args()
+
+    dated = "Date" in APP_LEDGERS[args.app][0]
+    if not dated and (args.detail == "month" or args.month):
+        parser.error(f"{args.app} ledgers are undated; --detail month and --month need personal_finance_manager.")
+    names = [os.path.splitext(os.path.basename(path))[0] for path in args.databases]
+    if len(set(names)) != len(names):
+        parser.error("Databases must have distinct file names; each one's outputs are named after it.")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+    print(f"{'database':<32} {'rows':>9} {'load':>7} {'charts':>7} {'pdf':>7} {'exports':>8} {'total':>7}")
+    for result in run_batch(args.app, args.databases, args.out_dir, args.income, args.currency.upper(),
+                            args.detail, args.formats, args.month, args.workers, args.rates):
+        results.append(result)
+        label = os.path.basename(result["database"])[-32:]
+        if "error" in result:
+            print(f"{label:<32} failed: {result['error']}", flush=True)
+            continue
+        t = result["timings"]
+        print(f"{label:<32} {result['rows']:>9} {t['load']:>7.2f} {t['charts']:>7.2f} {t['pdf']:>7.2f} "
+              f"{t['exports']:>8.2f} {t['total']:>7.2f}", flush=True)
+    elapsed = time.perf_counter() - start
+
+    done = [result for result in results if "error" not in result]
+    rows = sum(result["rows"] for result in done)
+    print(f"{len(done)}/{len(results)} ledgers in {elapsed:.2f}s with {args.workers} workers: "
+          f"{len(done) / elapsed:.2f} ledgers/s, {rows / elapsed:,.0f} rows/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"elapsed": elapsed, "workers": args.workers, "jobs": results}, f, indent=2)
+    if len(done) != len(results):
+        sys.exit(f"{len(results) - len(done)} ledgers failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Time duplicate detection through the fingerprint index, per entry and per bulk batch.
+
+    python benchmarks/bench_dedup.py [--rows 1000000] [--batch 100000] [--entries 10000]
+
+Builds a synthetic dated ledger, then times ``resolve_batch`` under each
+duplicate policy on a ``--batch``-row import of which about half duplicate
+recorded expenses (in other spellings of their category), and
+``resolve_expense`` on ``--entries`` single entries. Both should cost about
+the same per row whatever the ledger size; run with a smaller ``--rows`` to
+compare.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from currency import base_rates
+from dedup import DEDUP_POLICIES, resolve_batch, resolve_expense
+from run_benchmarks import synthetic_ledger
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def synthetic_batch(ledger, rows, seed=1):
+    # Half the rows re-enter recorded expenses as "CATEGORY 12 " and the like, the rest are new
+    rng = np.random.default_rng(seed)
+    recorded = ledger.to_frame().sample(rows // 2, replace=True, random_state=seed)
+    fresh = pd.DataFrame({
+        "Category": rng.choice(np.array([f"Import {i}" for i in range(500)], dtype=object), rows - len(recorded)),
+        "Date": (pd.Timestamp("2030-01-01")
+                 + pd.to_timedelta(rng.integers(0, 365, rows - len(recorded)), unit="D")).date,
+    })
+    batch = pd.concat([pd.DataFrame({"Category": recorded["Category"].astype(str).str.upper() + " ",
+                                     "Date": recorded["Date"].dt.date.to_numpy()}), fresh], ignore_index=True)
+    batch["Amount"] = np.round(rng.uniform(1, 500, len(batch)), 2)
+    batch["Currency"] = "USD"
+    return batch.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--entries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    ledger, seconds = timed(lambda: synthetic_ledger("personal_finance_manager", args.rows))
+    print(f"build ledger of {len(ledger)} rows (index included): {seconds:.3f}s")
+    rates = base_rates()
+    batch = synthetic_batch(ledger, args.batch)
+
+    for label, policy in DEDUP_POLICIES.items():
+        (kept, rejected), seconds = timed(lambda: resolve_batch(ledger, batch, policy, rates))
+        print(f"{label:>9} {len(batch)}-row batch: {seconds:.3f}s ({seconds / len(batch) * 1e6:.2f}us per row, "
+              f"{len(rejected)} rejected)")
+
+    entries = batch.head(args.entries)
+    values = list(zip(entries["Category"].tolist(), entries["Amount"].tolist(), entries["Date"].tolist()))
+    for label, policy in DEDUP_POLICIES.items():
+        _, seconds = timed(lambda: [resolve_expense(ledger, policy, category, amount, "USD", date, rates)
+                                    for category, amount, date in values])
+        print(f"{label:>9} single entry: {seconds / len(values) * 1e6:.1f}us")
+
+    count = 10_000
+    _, seconds = timed(lambda: [ledger.upsert(Category=f"Category {i % 200}", Amount=1.0, Currency="USD",
+                                              Date=datetime.date(2000, 1, 1) + datetime.timedelta(days=i % 9000))
+                                for i in range(count)])
+    print(f"upsert with the index kept current: {seconds / count * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Time each export format on a synthetic ledger and track peak memory.
+
+    python benchmarks/bench_export.py [--rows 1000000] [--formats CSV Parquet ...]
+
+Exports stream in chunks into a spooled buffer, so the peak Python memory
+allocated while serializing should stay within the budget however large the
+ledger grows (output beyond the spool limit goes to a temp file). This
+covers stream_export() only: the apps then read the finished file into
+bytes for st.download_button.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import EXPORT_FORMATS, stream_export
+
+
+def synthetic_ledger(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = np.array([f"Category {i}" for i in range(200)], dtype=object)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D")
+    return pd.DataFrame({
+        "Category": categories[rng.integers(0, len(categories), rows)],
+        "Amount": np.round(rng.uniform(1, 500, rows), 2),
+        "Date": dates.date,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", default=[name for name in EXPORT_FORMATS if name != "Excel"],
+                        choices=list(EXPORT_FORMATS))
+    parser.add_argument("--budget-mb", type=float, default=256.0, help="fail if any export's peak exceeds this")
+    args = parser.parse_args()
+
+    expense_df = synthetic_ledger(args.rows)
+    print(f"{args.rows} rows, ledger frame {expense_df.memory_usage(deep=True).sum() / 2**20:.1f} MiB")
+    print(f"{'format':>12} {'seconds':>8} {'output MiB':>11} {'peak MiB':>9}")
+    over_budget = []
+    for export_format in args.formats:
+        start = time.perf_counter()
+        with stream_export(expense_df, export_format)[0] as export_file:
+            seconds = time.perf_counter() - start
+            size = export_file.seek(0, os.SEEK_END)
+
+        # Tracing slows the export down a lot, so memory is measured on a second run
+        tracemalloc.start()
+        with stream_export(expense_df, export_format)[0]:
+            _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{export_format:>12} {seconds:>8.2f} {size / 2**20:>11.1f} {peak / 2**20:>9.1f}")
+        if peak > args.budget_mb * 2**20:
+            over_budget.append(export_format)
+
+    if over_budget:
+        sys.exit(f"Exports over the {args.budget_mb:.0f} MiB budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
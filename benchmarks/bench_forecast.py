@@ -0,0 +1,81 @@
+"""Time ForecastPlan.project() over a long horizon and many recurring expenses.
+
+    python benchmarks/bench_forecast.py [--items 500] [--months 120] [--repeat 20]
+
+Builds a synthetic plan of ``--items`` recurring expenses with mixed
+frequencies and currencies plus a budget for every category, then reports the
+best time of building the plan and of projecting it ``--months`` ahead. The
+projection runs on every rerun of the personal app, so it should stay in the
+milliseconds.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency import RateTable
+from forecast import FREQUENCIES, ForecastPlan
+
+TODAY = datetime.date(2025, 1, 15)
+
+
+def synthetic_plan(items, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = np.array([f"Category {i}" for i in range(50)], dtype=object)
+    starts = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 6 * 365, items), unit="D")
+    ends = starts + pd.to_timedelta(rng.integers(365, 20 * 365, items), unit="D")
+    recurring = pd.DataFrame({
+        "Category": categories[rng.integers(0, len(categories), items)],
+        "Amount": np.round(rng.uniform(1, 2_000, items), 2),
+        "Currency": rng.choice(["USD", "EUR", "KRW"], items),
+        "Frequency": rng.choice(list(FREQUENCIES), items),
+        "Start": starts,
+        # A third of the items never end
+        "End": ends.where(rng.random(items) > 1 / 3),
+    })
+    budgets = pd.DataFrame({"Category": categories, "Budget": 5_000.0, "Currency": "USD"})
+    return recurring, budgets
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--months", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rates = RateTable(pd.DataFrame({"Date": ["2020-01-01", "2020-01-01"], "Currency": ["EUR", "KRW"],
+                                    "Rate": [0.9, 1_300.0]}))
+    recurring, budgets = synthetic_plan(args.items)
+    plan, seconds = best_time(lambda: ForecastPlan(recurring, budgets), args.repeat)
+    print(f"build plan of {args.items} items: {seconds * 1e3:.2f}ms")
+    spent = pd.Series(10.0, index=pd.Index(budgets["Category"], name="Category"), name="Amount")
+    (daily, monthly, burn), seconds = best_time(
+        lambda: plan.project(rates, "USD", 10_000.0, 3_000.0, args.months, today=TODAY, spent=spent),
+        args.repeat)
+    first = np.datetime64(TODAY, "D")
+    last = (monthly["Month"].iloc[-1] + pd.DateOffset(months=1)).to_datetime64().astype("datetime64[D]")
+    _, counts = plan.schedule(int(first.astype(np.int64)), int(last.astype(np.int64)), plan.recurring["Amount"].to_numpy())
+    occurrences = int(counts.sum())
+    print(f"project {args.months} months ({occurrences} occurrences on {len(daily)} days): {seconds * 1e3:.2f}ms")
+    print(f"balance after {len(monthly)} months: {monthly['Balance'].iloc[-1]:.2f}, "
+          f"{int((burn['Used'] > 100).sum())} of {len(burn)} budgets overrun this month")
+
+
+if __name__ == "__main__":
+    main()
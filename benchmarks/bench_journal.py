@@ -0,0 +1,97 @@
+"""Time session restore from the journal snapshot against loading the SQLite store.
+
+    python benchmarks/bench_journal.py [--rows 1000000] [--tail 1000]
+
+Writes a synthetic ledger to both an ExpenseStore database and an
+ExpenseJournal snapshot with ``--tail`` journaled changes behind it, then
+times restoring a fresh ledger from each. Also reports the per-add cost of
+journaling and the cost of undo.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expense_store import ExpenseStore
+from journal import ExpenseJournal
+from ledger import ExpenseLedger
+
+START_DATE = datetime.date(2000, 1, 1)
+
+
+def new_ledger():
+    return ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"])
+
+
+def synthetic_columns(rows, seed=0):
+    # One expense per (category, day), so every row has its own key
+    rng = np.random.default_rng(seed)
+    days = np.arange(rows) // 200
+    return {
+        "Category": np.array([f"Category {i % 200}" for i in range(rows)], dtype=object),
+        "Amount": np.round(rng.uniform(1, 1_000, rows), 2),
+        "Currency": np.full(rows, "USD", dtype=object),
+        "Date": (np.datetime64(START_DATE, "D") + days).astype(object),
+    }
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=1_000)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        store = ExpenseStore(os.path.join(directory, "expenses.db"))
+        store.upsert_many(columns["Category"], columns["Amount"], columns["Date"], columns["Currency"])
+        store.close()
+
+        # Seed the journal from the store, then journal a tail of single adds behind the snapshot
+        path = os.path.join(directory, "expenses.journal")
+        journal = ExpenseJournal(path, snapshot_every=args.tail + 10)
+        ledger = journal.restore(new_ledger(), seed=ExpenseStore(os.path.join(directory, "expenses.db")).load)
+        tail_date = START_DATE - datetime.timedelta(days=1)
+        _, seconds = timed(lambda: [ledger.append(Category=f"Tail {i}", Amount=1.0, Currency="USD", Date=tail_date)
+                                    for i in range(args.tail)])
+        print(f"journaled add: {seconds / args.tail * 1e6:.1f}us")
+        _, seconds = timed(journal.undo)
+        print(f"undo of one add: {seconds * 1e6:.1f}us")
+        _, seconds = timed(journal.redo)
+        print(f"redo of one add: {seconds * 1e6:.1f}us")
+        _, seconds = timed(journal.snapshot)
+        print(f"snapshot of {len(ledger)} rows: {seconds:.3f}s")
+        # Journal one more tail of changes behind the fresh snapshot, for the restore below
+        for i in range(args.tail):
+            ledger.append(Category=f"After {i}", Amount=1.0, Currency="USD", Date=tail_date)
+        journal.close()
+
+        _, seconds = timed(lambda: [ledger.append(Category=f"Plain {i}", Amount=1.0, Currency="USD", Date=tail_date)
+                                    for i in range(args.tail)])
+        print(f"add without a journal: {seconds / args.tail * 1e6:.1f}us")
+
+        store = ExpenseStore(os.path.join(directory, "expenses.db"))
+        restored, store_seconds = timed(lambda: store.load(new_ledger()))
+        store.close()
+        print(f"restore from SQLite: {store_seconds:.3f}s ({len(restored)} rows)")
+        journal = ExpenseJournal(path)
+        restored, journal_seconds = timed(lambda: journal.restore(new_ledger()))
+        journal.close()
+        print(f"restore from snapshot + tail: {journal_seconds:.3f}s ({len(restored)} rows)")
+        print(f"speedup: {store_seconds / journal_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
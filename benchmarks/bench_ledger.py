@@ -0,0 +1,67 @@
+"""Time repeated "Add Expense" appends against the old per-add pd.concat path.
+
+    python benchmarks/bench_ledger.py [--max-rows 100000]
+
+The ledger's cost per add should stay flat as the ledger grows (linear total
+time), while pd.concat grows with the number of rows already stored.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import ExpenseLedger
+
+START_DATE = datetime.date(2024, 1, 1)
+
+
+def time_ledger_adds(rows):
+    ledger = ExpenseLedger(columns=["Category", "Amount", "Date"])
+    start = time.perf_counter()
+    for i in range(rows):
+        ledger.append(Category=f"Category {i % 50}", Amount=float(i % 500), Date=START_DATE)
+    ledger.to_frame()
+    return time.perf_counter() - start
+
+
+def time_concat_adds(rows):
+    expense_df = pd.DataFrame(columns=["Category", "Amount", "Date"])
+    start = time.perf_counter()
+    for i in range(rows):
+        new_expense = pd.DataFrame({"Category": [f"Category {i % 50}"], "Amount": [float(i % 500)], "Date": [START_DATE]})
+        expense_df = pd.concat([expense_df, new_expense], ignore_index=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-rows", type=int, default=100_000)
+    parser.add_argument("--max-concat-rows", type=int, default=5_000)
+    args = parser.parse_args()
+
+    sizes = [n for n in (1_000, 10_000, 100_000, 1_000_000) if n <= args.max_rows]
+    print(f"{'rows':>10} {'ledger s':>10} {'us/add':>8} {'concat s':>10} {'us/add':>8}")
+    per_add = []
+    for rows in sizes:
+        ledger_seconds = time_ledger_adds(rows)
+        per_add.append(ledger_seconds / rows)
+        line = f"{rows:>10} {ledger_seconds:>10.3f} {ledger_seconds / rows * 1e6:>8.2f}"
+        if rows <= args.max_concat_rows:
+            concat_seconds = time_concat_adds(rows)
+            line += f" {concat_seconds:>10.3f} {concat_seconds / rows * 1e6:>8.2f}"
+        print(line)
+
+    # Linear total time means the per-add cost does not grow with ledger size
+    growth = per_add[-1] / per_add[0]
+    print(f"per-add cost growth {sizes[0]} -> {sizes[-1]} rows: {growth:.2f}x")
+    if growth > 3:
+        sys.exit("Ledger appends are no longer amortized O(1).")
+
+
+if __name__ == "__main__":
+    main()
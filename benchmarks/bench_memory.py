@@ -0,0 +1,70 @@
+"""Report ledger memory per row: typed storage against the old object-dtype DataFrame.
+
+    python benchmarks/bench_memory.py [--rows 1000000]
+
+The old apps kept expenses in a DataFrame of Python strings, floats and
+datetime.date objects. The ledger stores category codes, integer cents and
+day numbers instead. For the keyed ledger each app builds (finance_manager on
+Category, personal_finance_manager on Category and Date) this prints bytes
+per row for both, broken down into the columns, the category dictionaries,
+the key index and the aggregates kept beside it, plus the typed frame the
+ledger hands to views.
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import APPS, synthetic_ledger
+
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(deep=True, index=False).sum())
+
+
+def legacy_frame(ledger):
+    # The same expenses as the old apps held them: one Python object per cell
+    frame = ledger.to_frame()
+    columns = {name: frame[name].astype(object) for name in ledger.columns}
+    if "Date" in columns:
+        columns["Date"] = pd.Series(frame["Date"].dt.date, dtype=object)
+    return pd.DataFrame(columns)
+
+
+def report(app, rows):
+    ledger = synthetic_ledger(app, rows)
+    rows = len(ledger)
+    # The fingerprint index folds the category names at the first duplicate check, which every entry runs
+    ledger.fingerprints.match("Category 0")
+    legacy = legacy_frame(ledger)
+    usage = ledger.memory_usage()
+    typed = frame_bytes(ledger.to_frame())
+
+    print(f"{app}: {rows} rows, key {list(ledger.key)}")
+    print(f"{'part':>14} {'object df':>12} {'ledger':>12}")
+    for name in ledger.columns:
+        print(f"{name:>14} {frame_bytes(legacy[[name]]) / rows:>12.1f} {usage[name] / rows:>12.1f}")
+    for name in usage:
+        if name not in ledger.columns:
+            print(f"{name:>14} {'':>12} {usage[name] / rows:>12.1f}")
+    legacy_total = frame_bytes(legacy) / rows
+    ledger_total = sum(usage.values()) / rows
+    print(f"{'bytes/row':>14} {legacy_total:>12.1f} {ledger_total:>12.1f}")
+    print(f"typed frame from to_frame(): {typed / rows:.1f} bytes/row")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    for app in APPS:
+        report(app, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Time create_pdf_report on a synthetic ledger at each report detail level.
+
+    python benchmarks/bench_pdf_report.py [--rows 100000] [--target-seconds 30]
+
+Target (documented in the README): a 100k-row report listing every expense
+builds in under 30 seconds, and the per-category / per-month summaries in
+under 2 seconds.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_export import synthetic_ledger
+from figure_cache import render_pngs
+from pdf_report import REPORT_DETAILS
+from personal_finance_manager import create_pdf_report, generate_pdfvisualizations
+
+SUMMARY_TARGET_SECONDS = 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--target-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    expense_df = synthetic_ledger(args.rows)
+    income = float(expense_df["Amount"].sum()) * 1.2
+    total_expenses = float(expense_df["Amount"].sum())
+    category_amounts = expense_df.groupby("Category")["Amount"].sum()
+    charts = render_pngs(*generate_pdfvisualizations(expense_df, income, total_expenses, income - total_expenses, category_amounts))
+
+    missed = []
+    for name, detail in REPORT_DETAILS.items():
+        start = time.perf_counter()
+        pdf_data = create_pdf_report(expense_df, income, total_expenses, income - total_expenses, *charts, "USD", detail)
+        seconds = time.perf_counter() - start
+        target = args.target_seconds if detail == "rows" else SUMMARY_TARGET_SECONDS
+        print(f"{name:>14}: {seconds:6.2f}s (target {target:.0f}s), {len(pdf_data) / 2**20:.1f} MiB")
+        if seconds > target:
+            missed.append(name)
+
+    if missed:
+        sys.exit(f"Missed the report time target for: {', '.join(missed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time period totals from the ledger's range index against filtering the view.
+
+    python benchmarks/bench_ranges.py [--rows 1000000] [--queries 200]
+
+Builds a synthetic dated ledger, then answers ``--queries`` random date
+ranges twice: as a total plus per-category breakdown from
+``ledger.aggregates.ranges``, and by masking and grouping the DataFrame view
+as the apps did before. Also reports the cost of keeping the index current
+while expenses are upserted.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import synthetic_ledger
+
+START_DATE = datetime.date(2000, 1, 1)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    ledger, seconds = timed(lambda: synthetic_ledger("personal_finance_manager", args.rows))
+    print(f"build ledger of {len(ledger)} rows (index included): {seconds:.3f}s")
+    ranges = ledger.aggregates.ranges
+    expense_df = ledger.to_frame(sort_by="Date")
+
+    rng = np.random.default_rng(1)
+    bounds = np.sort(rng.integers(0, 25 * 365, (args.queries, 2)), axis=1)
+    periods = [(START_DATE + datetime.timedelta(days=int(low)), START_DATE + datetime.timedelta(days=int(high)))
+               for low, high in bounds]
+
+    def indexed():
+        return [(ranges.total(start, end), ranges.category_totals(start, end)) for start, end in periods]
+
+    def scanned():
+        results = []
+        for start, end in periods:
+            mask = (expense_df["Date"] >= pd.Timestamp(start)) & (expense_df["Date"] <= pd.Timestamp(end))
+            period_df = expense_df[mask]
+            results.append((period_df["Amount"].sum(), period_df.groupby("Category", observed=True)["Amount"].sum()))
+        return results
+
+    _, index_seconds = timed(indexed)
+    _, scan_seconds = timed(scanned)
+    print(f"period total + categories, range index: {index_seconds / args.queries * 1e3:.3f}ms per query")
+    print(f"period total + categories, view filter: {scan_seconds / args.queries * 1e3:.3f}ms per query")
+    print(f"speedup: {scan_seconds / index_seconds:.1f}x")
+
+    count = 10_000
+    _, seconds = timed(lambda: [ledger.upsert(Category=f"Category {i % 200}", Amount=1.0, Currency="USD",
+                                              Date=START_DATE + datetime.timedelta(days=i % 9000))
+                                for i in range(count)])
+    print(f"upsert with the index kept current: {seconds / count * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Fail if cold-start imports of the app modules regress.
+
+    python benchmarks/check_import_time.py [--budget-ms 250] [--runs 5]
+
+Each app module is imported in a fresh interpreter with ``-X importtime``.
+Two things are checked:
+
+* none of the heavy PDF/TTS/export/chart libraries are imported at startup
+  (they are loaded lazily the first time a feature needs them), and
+* the import time the app adds on top of Streamlit and pandas, which every
+  rerun needs anyway, stays within the budget. The best of several runs is
+  used to keep the number stable.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ["finance_manager", "personal_finance_manager"]
+BASELINE_IMPORTS = ["streamlit", "pandas", "numpy"]
+
+# Only needed by "Generate PDF Report", "Explain Expenses", exports and charts
+LAZY_MODULES = ["matplotlib", "seaborn", "reportlab", "gtts", "pyttsx3", "openpyxl", "plotly.express"]
+
+
+def import_profile(modules):
+    # Returns (total cumulative import time in microseconds, set of imported module names)
+    statement = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    total = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+        # Top-level imports are indented by a single space; nested ones are already counted in them
+        if name.startswith(" ") and not name.startswith("  "):
+            total += int(cumulative)
+    return total, imported
+
+
+def best_of(modules, runs):
+    profiles = [import_profile(modules) for _ in range(runs)]
+    return min(total for total, _ in profiles), profiles[0][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline, _ = best_of(BASELINE_IMPORTS, args.runs)
+    print(f"{'+'.join(BASELINE_IMPORTS)}: {baseline / 1000:.0f} ms")
+    failures = []
+    for module in APP_MODULES:
+        total, imported = best_of([module], args.runs)
+        own_ms = (total - baseline) / 1000
+        eager = [name for name in LAZY_MODULES if name in imported]
+        print(f"{module}: {total / 1000:.0f} ms total, {own_ms:.0f} ms on top of the baseline "
+              f"(budget {args.budget_ms:.0f} ms)")
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at startup")
+        if own_ms > args.budget_ms:
+            failures.append(f"{module} adds {own_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
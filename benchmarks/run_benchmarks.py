@@ -0,0 +1,227 @@
+"""Benchmark the core functions of both apps across ledger sizes.
+
+    python benchmarks/run_benchmarks.py [--sizes 1000 100000 1000000] [--apps ...]
+                                        [--output results.json]
+                                        [--baseline benchmarks/baseline.json] [--update-baseline]
+
+For every app variant and ledger size a synthetic ledger is generated (with a
+fixed seed), then export_data (each format), the chart builders,
+create_pdf_report (each detail level) and the add/update/delete paths of
+main() are timed. Results are written as JSON and compared against a stored
+baseline; a case counts as a regression when it is both ``--tolerance`` times
+slower and ``--min-delta-ms`` slower than its baseline, and the run exits
+non-zero if any case regressed.
+
+Cases whose cost is dominated by output size (Excel, full PDF tables) are
+skipped above the limits in CASE_LIMITS and reported as such.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency import RATES_PATH, RateTable, reporting_view
+from exporter import EXPORT_FORMATS
+from figure_cache import render_pngs
+from ledger import ExpenseLedger
+from pdf_report import REPORT_DETAILS
+
+APPS = ["finance_manager", "personal_finance_manager"]
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Mutations timed per add/update/delete case
+OPERATIONS = 200
+
+# Largest ledger (rows) or category count each case is run at
+CASE_LIMITS = {
+    "export_data[Excel]": {"rows": 100_000},
+    "create_pdf_report[rows]": {"rows": 100_000},
+    "create_pdf_report[category]": {"categories": 100_000},
+}
+
+
+def synthetic_ledger(app, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.uniform(1, 500, rows), 2)
+    if app == "finance_manager":
+        # finance_manager keys expenses on Category, so every row needs its own
+        ledger = ExpenseLedger(columns=["Category", "Amount", "Currency"], key=["Category"], capacity=rows)
+        ledger.extend(Category=[f"Category {i}" for i in range(rows)], Amount=amounts,
+                      Currency=np.full(rows, "USD", dtype=object))
+        return ledger
+    ledger = ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"], capacity=rows)
+    categories = np.array([f"Category {i}" for i in range(200)], dtype=object)
+    frame = pd.DataFrame({
+        "Category": categories[rng.integers(0, len(categories), rows)],
+        "Amount": amounts,
+        "Date": pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 25 * 365, rows), unit="D"),
+    }).drop_duplicates(subset=["Category", "Date"])
+    ledger.extend(Category=frame["Category"].to_numpy(), Amount=frame["Amount"].to_numpy(),
+                  Currency=np.full(len(frame), "USD", dtype=object), Date=frame["Date"].dt.date.to_numpy())
+    return ledger
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def within_limits(case, rows, categories):
+    limits = CASE_LIMITS.get(case, {})
+    return rows <= limits.get("rows", rows) and categories <= limits.get("categories", categories)
+
+
+def app_cases(app, module, ledger):
+    # (case name, zero-argument callable) for every timed function of one app
+    income = float(ledger.aggregates.total) * 2 + 1_000_000
+    rates = RateTable.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), RATES_PATH))
+    expense_df, total_expenses, category_amounts, date_amounts = reporting_view(ledger, rates, "USD")
+    total_balance = income - total_expenses
+    pdf_charts = render_pngs(*module.generate_pdfvisualizations(
+        expense_df.head(20), income, total_expenses, total_balance))
+
+    # Switching the display currency converts the whole ledger
+    cases = [("reporting_view[EUR]", lambda: reporting_view(ledger, rates, "EUR"))]
+    cases += [(f"export_data[{name}]", lambda name=name: module.export_data(expense_df, name)) for name in EXPORT_FORMATS]
+    cases.append(("generate_visualizations", lambda: module.generate_visualizations(
+        expense_df, income, total_expenses, total_balance, category_amounts)))
+    if hasattr(module, "generate_trend_visualization"):
+        cases.append(("generate_trend_visualization",
+                      lambda: module.generate_trend_visualization(date_amounts)))
+    cases.append(("generate_pdfvisualizations", lambda: render_pngs(*module.generate_pdfvisualizations(
+        expense_df, income, total_expenses, total_balance, category_amounts))))
+    for detail in REPORT_DETAILS.values():
+        if detail == "month" and "Date" not in ledger.columns:
+            continue
+        cases.append((f"create_pdf_report[{detail}]", lambda detail=detail: module.create_pdf_report(
+            expense_df, income, total_expenses, total_balance, *pdf_charts, "USD", detail)))
+    return cases
+
+
+def mutation_cases(app, module, ledger):
+    # Per-operation cost of the add/update/delete paths pulled out of main()
+    income = float(ledger.aggregates.total) * 2 + 1_000_000
+    existing = ledger.column("Category")[:OPERATIONS].tolist()
+
+    if app == "finance_manager":
+        def add():
+            for i in range(OPERATIONS):
+                module.add_expense(ledger, income, f"New category {i}", 1.0)
+
+        def update():
+            for category in existing:
+                module.update_expense(ledger, income, category, 2.0)
+
+        def delete():
+            for i in range(OPERATIONS):
+                module.delete_expense(ledger, f"New category {i}")
+
+        return [("add_expense", add), ("update_expense", update), ("delete_expense", delete)]
+
+    date = datetime.date(1999, 1, 1)
+
+    def add():
+        for i in range(OPERATIONS):
+            module.add_expense(ledger, income, f"New category {i}", 1.0, date)
+
+    def upsert():
+        for i in range(OPERATIONS):
+            module.add_expense(ledger, income, f"New category {i}", 2.0, date)
+
+    return [("add_expense", add), ("add_expense[upsert]", upsert)]
+
+
+def run(apps, sizes, repeat):
+    # Streamlit calls in export_data run in bare mode here; silence its context warnings
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    results = {}
+    for app in apps:
+        module = importlib.import_module(app)
+        results[app] = {}
+        for rows in sizes:
+            ledger = synthetic_ledger(app, rows)
+            categories = len(ledger.aggregates.category_totals())
+            timings = {}
+            for case, function in app_cases(app, module, ledger):
+                if not within_limits(case, rows, categories):
+                    timings[case] = None
+                    continue
+                timings[case] = best_time(function, repeat if rows < 100_000 else 1)
+                print(f"{app:>26} {rows:>9} {case:<30} {timings[case]:9.4f}s", flush=True)
+            for case, function in mutation_cases(app, module, ledger):
+                # Mutations change the ledger, so they run once, in order, and report per-operation time
+                timings[case] = best_time(function, 1) / OPERATIONS
+                print(f"{app:>26} {rows:>9} {case:<30} {timings[case] * 1e6:9.1f}us/op", flush=True)
+            results[app][str(rows)] = timings
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    regressions = []
+    for app, sizes in results.items():
+        for rows, timings in sizes.items():
+            for case, seconds in timings.items():
+                previous = baseline.get(app, {}).get(rows, {}).get(case)
+                if seconds is None or previous is None:
+                    continue
+                if seconds > previous * tolerance and seconds - previous > min_delta:
+                    regressions.append(f"{app} {rows} rows {case}: {previous:.4f}s -> {seconds:.4f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs for ledgers under 100k rows")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "operations_per_mutation_case": OPERATIONS,
+        "results": run(args.apps, args.sizes, args.repeat),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(report["results"], baseline, args.tolerance, args.min_delta_ms / 1000)
+    if regressions:
+        sys.exit("Performance regressions against the baseline:\n" + "\n".join(regressions))
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+# Slices drawn in the category breakdown charts; every other category is summed into OTHER_LABEL
+TOP_CATEGORIES = 10
+OTHER_LABEL = "Other"
+
+# Optional CSV with Alias,Category columns mapping messy category names to one chart label
+ALIASES_PATH = os.environ.get("CATEGORY_ALIASES_PATH", "category_aliases.csv")
+
+
+def fold(name):
+    # Grouping key for a category name: case and runs of whitespace do not matter
+    return " ".join(str(name).split()).casefold()
+
+
+def load_aliases(path=ALIASES_PATH):
+    """Read the alias map as ``{folded alias: category label}``; empty when the file does not exist."""
+    if not os.path.exists(path):
+        return {}
+    aliases = pd.read_csv(path, dtype=str).dropna()
+    return {fold(alias): " ".join(category.split()) for alias, category in zip(aliases["Alias"], aliases["Category"])}
+
+
+@functools.lru_cache(maxsize=None)
+def default_aliases():
+    return load_aliases()
+
+
+def merge_categories(category_amounts, aliases=None):
+    """Sum categories that only differ in case or spacing, or that ``aliases`` maps to the same label.
+
+    A merged group is labelled with its alias target, or else with the
+    spelling carrying the largest amount.
+    """
+    aliases = default_aliases() if aliases is None else aliases
+    names = category_amounts.index.astype(str).tolist()
+    groups = [fold(name) for name in names]
+    aliased = [position for position, key in enumerate(groups) if key in aliases]
+    if not aliased and len(set(groups)) == len(groups):
+        return category_amounts
+    labels = list(names)
+    for position in aliased:
+        labels[position] = aliases[groups[position]]
+        groups[position] = fold(labels[position])
+    frame = pd.DataFrame({"Group": groups, "Label": labels, "Amount": category_amounts.to_numpy(dtype=np.float64)})
+    groups = frame.groupby("Group", sort=False)
+    amounts = groups["Amount"].sum()
+    label_rows = frame.loc[groups["Amount"].idxmax(), ["Group", "Label"]]
+    group_labels = dict(zip(label_rows["Group"], label_rows["Label"]))
+    group_labels.update((fold(label), label) for label in aliases.values() if fold(label) in group_labels)
+    index = pd.Index([group_labels[group] for group in amounts.index], name=category_amounts.index.name)
+    return pd.Series(amounts.to_numpy(), index=index, name=category_amounts.name)
+
+
+def top_categories(category_amounts, n=TOP_CATEGORIES):
+    """The ``n`` largest categories, largest first, with the rest summed into OTHER_LABEL.
+
+    Uses a partial selection (``np.argpartition``), so picking the slices is
+    linear in the number of categories rather than a full sort.
+    """
+    if len(category_amounts) <= n:
+        return category_amounts.sort_values(ascending=False, kind="stable")
+    values = category_amounts.to_numpy(dtype=np.float64)
+    top = np.sort(np.argpartition(values, len(values) - n)[-n:])
+    top = top[np.argsort(-values[top], kind="stable")]
+    shown = category_amounts.iloc[top]
+    other = values.sum() - shown.sum()
+    if OTHER_LABEL in shown.index:
+        # A category that is literally called "Other" joins the remainder
+        other += shown[OTHER_LABEL]
+        shown = shown.drop(OTHER_LABEL)
+    other = pd.Series([other], index=pd.Index([OTHER_LABEL], name=category_amounts.index.name))
+    return pd.concat([shown.set_axis(shown.index.astype(str)), other]).rename(category_amounts.name)
+
+
+def chart_categories(category_amounts, n=TOP_CATEGORIES, aliases=None):
+    # Per-category sums as drawn by the web and PDF breakdown charts
+    return top_categories(merge_categories(category_amounts, aliases), n)
@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from ledger import DAY_OFFSET, pack_keys, to_days
+from timeseries import rollup
+
+# Rates are quoted as units of each currency per one unit of the base currency
+BASE_CURRENCY = "USD"
+RATES_PATH = os.environ.get("FX_RATES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.csv"))
+
+# Undated ledgers (finance_manager) convert at the latest rate on file
+_LATEST_DAY = DAY_OFFSET - 1
+
+
+class RateTable:
+    """Dated exchange rates with vectorized as-of lookups.
+
+    Rows are (Date, Currency, Rate). A rate applies from its date until the
+    next rate for the same currency; dates before a currency's first rate use
+    that first rate. Rows are kept sorted on a single int64 key built from the
+    currency and the day, so looking up the rate for every expense of a ledger
+    is one ``np.searchsorted`` over the table instead of a loop or a merge.
+    """
+
+    def __init__(self, rates=None):
+        if rates is None:
+            rates = pd.DataFrame({"Date": [], "Currency": [], "Rate": []})
+        rates = pd.DataFrame({
+            "Date": pd.to_datetime(rates["Date"]).dt.normalize(),
+            "Currency": rates["Currency"].astype(str).str.strip().str.upper(),
+            "Rate": pd.to_numeric(rates["Rate"], errors="coerce"),
+        }).dropna()
+        if (rates["Rate"] <= 0).any():
+            raise ValueError("Exchange rates must be positive.")
+        rates = rates[rates["Currency"] != BASE_CURRENCY]
+        rates = rates.sort_values(["Currency", "Date"], kind="stable")
+        self.rates = rates.drop_duplicates(subset=["Currency", "Date"], keep="last").reset_index(drop=True)
+
+        self.currencies = pd.Index(self.rates["Currency"].unique())
+        codes = self.currencies.get_indexer(self.rates["Currency"]).astype(np.int64)
+        days = self.rates["Date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        self._keys = pack_keys(codes, days)
+        self._rates = self.rates["Rate"].to_numpy(dtype=np.float64)
+        self._first = np.searchsorted(self._keys, pack_keys(np.arange(len(self.currencies)), -DAY_OFFSET))
+        # Identifies the table contents in cache keys
+        self.key = hashlib.sha256(pd.util.hash_pandas_object(self.rates, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path=RATES_PATH):
+        if not os.path.exists(path):
+            return cls()
+        return cls(pd.read_csv(path))
+
+    def save(self, path=RATES_PATH):
+        self.rates.assign(Date=self.rates["Date"].dt.strftime("%Y-%m-%d")).to_csv(path, index=False)
+
+    def _rates_for(self, currencies, days):
+        # Per-row rate for parallel arrays of currency names and day numbers
+        inverse, names = pd.factorize(np.asarray(currencies, dtype=object))
+        name_codes = self.currencies.get_indexer(names)
+        missing = [name for name, code in zip(names, name_codes) if code < 0 and name != BASE_CURRENCY]
+        if missing:
+            raise ValueError(f"No exchange rate for {', '.join(map(str, missing))}.")
+        codes = name_codes[inverse]
+        is_base = codes < 0
+        codes = np.where(is_base, 0, codes)
+        if len(self.currencies) == 0:
+            return np.ones(len(codes), dtype=np.float64)
+        positions = np.searchsorted(self._keys, pack_keys(codes, days), side="right") - 1
+        positions = np.maximum(positions, self._first[codes])
+        return np.where(is_base, 1.0, self._rates[positions])
+
+    def factors(self, currencies, dates, target):
+        """Multipliers converting amounts in ``currencies`` into ``target``.
+
+        Both legs use the rate in effect on each row's date (``dates`` may be
+        None for undated ledgers, which use the latest rates).
+        """
+        count = len(currencies)
+        days = np.full(count, _LATEST_DAY, dtype=np.int64) if dates is None else to_days(dates)
+        source = self._rates_for(currencies, days)
+        destination = self._rates_for(np.full(count, target, dtype=object), days)
+        return destination / source
+
+    def convert(self, amounts, currencies, dates, target):
+        return np.asarray(amounts, dtype=np.float64) * self.factors(currencies, dates, target)
+
+    def convert_one(self, amount, currency, date, target):
+        if currency == target:
+            return float(amount)
+        return float(self.convert([amount], [currency], None if date is None else [date], target)[0])
+
+
+@functools.lru_cache(maxsize=None)
+def base_rates():
+    # Table without any rates, for callers that only ever use the base currency
+    return RateTable()
+
+
+def _single_currency(ledger, target):
+    return ledger.aggregates.keys("Currency") <= {target}
+
+
+def reporting_total(ledger, rates, target):
+    # Total expenses of the ledger in ``target``
+    if _single_currency(ledger, target):
+        return ledger.aggregates.total
+    if "Date" not in ledger.columns:
+        # Undated rows convert at one rate per currency, so the per-currency sums are enough
+        sums = ledger.aggregates.totals("Currency")
+        return float(np.dot(sums.to_numpy(), rates.factors(sums.index.to_numpy(dtype=object), None, target)))
+    dates = ledger.column("Date")
+    return float(np.dot(ledger.column("Amount"), rates.factors(ledger.column("Currency"), dates, target)))
+
+
+def reporting_view(ledger, rates, target, sort_by=None):
+    """The ledger converted into ``target`` for display, charts, export and reports.
+
+    Returns ``(expense_df, total_expenses, category_amounts, date_amounts)``.
+    ``expense_df`` has Amount in ``target`` next to the Original Amount and
+    Original Currency of each expense; ``date_amounts`` is None for undated
+    ledgers. A ledger already in ``target`` reuses the ledger aggregates, any
+    other conversion is one vectorized pass over the ledger.
+    """
+    frame = ledger.to_frame(sort_by=sort_by)
+    view = frame.rename(columns={"Amount": "Original Amount", "Currency": "Original Currency"})
+    dated = "Date" in ledger.columns
+    if _single_currency(ledger, target):
+        view.insert(1, "Amount", frame["Amount"])
+        date_amounts = ledger.aggregates.date_totals() if dated else None
+        return view, ledger.aggregates.total, ledger.aggregates.category_totals(), date_amounts
+
+    amounts = rates.convert(frame["Amount"], frame["Currency"], frame["Date"] if dated else None, target)
+    view.insert(1, "Amount", amounts)
+    category_amounts = view.groupby("Category", observed=True)["Amount"].sum()
+    category_amounts = category_amounts.set_axis(category_amounts.index.astype(str)).sort_index()
+    date_amounts = view.groupby("Date", sort=True)["Amount"].sum() if dated else None
+    return view, float(amounts.sum()), category_amounts, date_amounts
+
+
+def reporting_period(ledger, expense_df, target, start=None, end=None):
+    """Expenses of the view dated ``start`` to ``end``, with their total and per-category sums.
+
+    Bounds are inclusive and None leaves that end open. ``expense_df`` is a
+    reporting_view sorted by Date, so the period is one slice found by binary
+    search. A ledger already in ``target`` answers the sums from its range
+    index (``ledger.aggregates.ranges``) without touching the rows; any other
+    conversion sums the converted slice. Returns ``(period_df,
+    total_expenses, category_amounts)``.
+    """
+    dates = expense_df["Date"]
+    low = 0 if start is None else int(dates.searchsorted(pd.Timestamp(start), side="left"))
+    high = len(dates) if end is None else int(dates.searchsorted(pd.Timestamp(end), side="right"))
+    period_df = expense_df.iloc[low:max(low, high)]
+    if _single_currency(ledger, target):
+        ranges = ledger.aggregates.ranges
+        return period_df, ranges.total(start, end), ranges.category_totals(start, end)
+    category_amounts = period_df.groupby("Category", observed=True)["Amount"].sum()
+    category_amounts = category_amounts.set_axis(category_amounts.index.astype(str)).sort_index()
+    return period_df, float(period_df["Amount"].sum()), category_amounts
+
+
+def reporting_date_totals(ledger, date_amounts, target, granularity="Date"):
+    # Per-day / week / month totals in ``target``: the ledger's incremental rollups when no
+    # conversion is needed, otherwise rolled up from the converted per-day totals
+    if _single_currency(ledger, target):
+        return ledger.aggregates.date_totals(granularity)
+    return rollup(date_amounts, granularity)
@@ -0,0 +1,218 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from categories import fold
+from ledger import INDEX_MERGE_EVERY, KeyIndex
+
+# What to do with an expense whose fingerprint matches one already recorded
+DEDUP_POLICIES = {
+    "Reject": "reject",
+    "Merge": "merge",
+    "Sum": "sum",
+    "Keep both": "keep",
+}
+
+
+class FingerprintIndex:
+    """Finds recorded expenses with the same transaction fingerprint as an entry.
+
+    A fingerprint is the category name folded like the breakdown charts fold
+    it (case and runs of whitespace do not matter) plus the expense date for
+    ledgers keyed on category and date. The ledger's key index already finds
+    the row of any (category, date), so only the folded names are indexed
+    here: a hash of each distinct folded name maps, through a KeyIndex, to
+    the first category code folding to it, and further spellings ("Food" and
+    "food ") sit in a side table. Checking an entry is one fold and one key
+    lookup per spelling, for a single entry or for every row of a bulk
+    import, and the index costs 16 bytes per category rather than per expense.
+
+    Built by ExpenseLedger for ledgers keyed on Category, or on Category and
+    Date; names added to the ledger's dictionary are folded at the next check.
+    """
+
+    def __init__(self, ledger, dated=True):
+        self._ledger = ledger
+        self.dated = dated
+        self._folds = KeyIndex()
+        self._extra = {}
+        self._known = 0
+
+    @property
+    def nbytes(self):
+        return self._folds.nbytes + sys.getsizeof(self._extra) + sum(
+            sys.getsizeof(key) + sys.getsizeof(codes) + sum(sys.getsizeof(code) for code in codes)
+            for key, codes in self._extra.items())
+
+    def _add(self, key, code):
+        if self._folds.get(key) is None:
+            self._folds.add(key, code)
+        else:
+            self._extra.setdefault(key, []).append(code)
+
+    def _catch_up(self):
+        # Index the folded names of categories the ledger stored since the last check
+        names = self._ledger.dictionary("Category")[self._known:]
+        start, self._known = self._known, self._known + len(names)
+        keys = [hash(fold(name)) for name in names]
+        if len(keys) < INDEX_MERGE_EVERY:
+            for code, key in enumerate(keys, start):
+                self._add(key, code)
+            return
+        # A ledger loaded in bulk: first spellings go in with one merge
+        keys = np.array(keys, dtype=np.int64)
+        codes = np.arange(start, self._known)
+        first = ~pd.Series(keys).duplicated().to_numpy() & (self._folds.get_many(keys) < 0)
+        self._folds.add_many(keys[first], codes[first])
+        for key, code in zip(keys[~first].tolist(), codes[~first].tolist()):
+            self._extra.setdefault(key, []).append(code)
+
+    def _spellings(self, key, folded, first):
+        # Recorded names folding to ``folded``, oldest first; the fold check rules out hash collisions
+        names = self._ledger.dictionary("Category")
+        return [names[code] for code in [first] + self._extra.get(key, []) if fold(names[code]) == folded]
+
+    def match(self, category, date=None):
+        """Recorded category with the same fingerprint as (category, date), or None."""
+        self._catch_up()
+        folded = fold(category)
+        key = hash(folded)
+        first = self._folds.get(key)
+        if first is None:
+            return None
+        for name in self._spellings(key, folded, first):
+            if self._ledger.lookup(**_key_values(self._ledger, name, date)) is not None:
+                return name
+        return None
+
+    def match_many(self, categories, dates=None):
+        """Recorded category matching each (category, date) entry, or None; one key lookup per spelling."""
+        self._catch_up()
+        inverse, names = pd.factorize(np.asarray(categories, dtype=object))
+        folded = [fold(name) for name in names]
+        keys = [hash(name) for name in folded]
+        firsts = self._folds.get_many(np.array(keys, dtype=np.int64)).tolist()
+        spellings = [self._spellings(key, name, first) if first >= 0 else []
+                     for key, name, first in zip(keys, folded, firsts)]
+        dates = np.asarray(dates, dtype=object) if self.dated else None
+        matches = np.full(len(inverse), None, dtype=object)
+        # Try each entry's oldest recorded spelling first, then the next for entries still unmatched
+        for rank in range(max(map(len, spellings), default=0)):
+            candidates = np.array([names[rank] if rank < len(names) else None for names in spellings],
+                                  dtype=object)[inverse]
+            todo = np.flatnonzero(pd.isna(matches) & pd.notna(candidates))
+            rows = self._ledger.lookup_many(**_key_values(self._ledger, candidates[todo],
+                                                          dates[todo] if self.dated else None))
+            found = todo[rows >= 0]
+            matches[found] = candidates[found]
+        return matches
+
+
+def _key_values(ledger, category, date):
+    values = {"Category": category}
+    if "Date" in ledger.columns:
+        values["Date"] = date
+    return values
+
+
+def free_category(ledger, category, date=None, taken=()):
+    # "Category (2)", "Category (3)", ...: the first variant with no recorded fingerprint, nor one in ``taken``
+    # (folded names already used on that date)
+    fingerprints = ledger.fingerprints
+    number = 2
+    while True:
+        candidate = f"{str(category).strip()} ({number})"
+        if fold(candidate) not in taken and fingerprints.match(candidate, date) is None:
+            return candidate
+        number += 1
+
+
+def resolve_expense(ledger, policy, category, amount, currency, date=None, rates=None):
+    """Apply a duplicate policy to one entered expense.
+
+    Returns the ``(category, amount, currency)`` to upsert, or None when
+    ``policy`` is "reject" and the expense duplicates a recorded one. "merge"
+    overwrites the recorded expense; "sum" adds to it, converting the recorded
+    amount into ``currency``; "keep" records the entry next to it under a free
+    "Category (2)" name.
+    """
+    existing = ledger.fingerprints.match(category, date)
+    if existing is None:
+        return category, amount, currency
+    if policy == "reject":
+        return None
+    if policy == "merge":
+        return existing, amount, currency
+    if policy == "sum":
+        row = ledger.lookup(**_key_values(ledger, existing, date))
+        recorded = rates.convert_one(ledger.get(row, "Amount"), ledger.get(row, "Currency"), date, currency)
+        return existing, recorded + amount, currency
+    if policy == "keep":
+        return free_category(ledger, category, date), amount, currency
+    raise ValueError(f"Unknown duplicate policy: {policy}")
+
+
+def resolve_batch(ledger, rows, policy, rates=None):
+    """Apply a duplicate policy to a batch of (Category, Amount, Currency[, Date]) rows.
+
+    Duplicates are found by fingerprint, within the batch and against the
+    ledger, with one hash lookup per row. Returns the rows to upsert and the
+    rejected rows. "reject" keeps the first row of each fingerprint that is
+    not recorded yet. "merge" and "sum" rewrite every row of a fingerprint to
+    one category (the recorded spelling, else the batch's first) so the last
+    row wins, "sum" after adding up the batch rows and the recorded amount
+    (converted into the row's currency). "keep" renames every further
+    duplicate to a free "Category (2)" name.
+    """
+    dated = "Date" in ledger.columns
+    existing = ledger.fingerprints.match_many(rows["Category"].to_numpy(), rows["Date"] if dated else None)
+    recorded = pd.notna(existing)
+    # Fold each distinct spelling once
+    codes, names = pd.factorize(rows["Category"].to_numpy(dtype=object))
+    folded = pd.Series(np.array([fold(name) for name in names], dtype=object)[codes], index=rows.index)
+    group_keys = [folded] + ([rows["Date"]] if dated else [])
+    first = rows.groupby(group_keys, sort=False).cumcount().to_numpy() == 0
+
+    if policy == "reject":
+        return rows[~recorded & first], rows[recorded | ~first]
+    rows = rows.copy()
+    if policy == "keep":
+        renamed = np.flatnonzero(recorded | ~first)
+        if renamed.size:
+            dates = rows["Date"].tolist() if dated else [None] * len(rows)
+            taken = {}
+            for name, date in zip(group_keys[0][first & ~recorded].tolist(), np.asarray(dates, dtype=object)[first & ~recorded]):
+                taken.setdefault(date, set()).add(name)
+            categories = rows["Category"].to_numpy(dtype=object).copy()
+            for position in renamed.tolist():
+                used = taken.setdefault(dates[position], set())
+                categories[position] = free_category(ledger, categories[position], dates[position], used)
+                used.add(fold(categories[position]))
+            rows["Category"] = categories
+        return rows, rows.iloc[:0]
+    if policy not in ("merge", "sum"):
+        raise ValueError(f"Unknown duplicate policy: {policy}")
+
+    categories = rows["Category"].groupby(group_keys, sort=False).transform("first").to_numpy(dtype=object)
+    categories[recorded] = existing[recorded]
+    rows["Category"] = categories
+    if policy == "sum":
+        key_columns = ["Category", "Date"] if dated else ["Category"]
+        amounts = rows.groupby(key_columns, sort=False)["Amount"].cumsum().to_numpy(dtype=np.float64, copy=True)
+        # The recorded amount, converted into each row's currency, carries into every row of its fingerprint
+        hits = np.flatnonzero(recorded)
+        if hits.size:
+            hit_rows = rows.iloc[hits]
+            records = ledger.records([ledger.lookup(**_key_values(ledger, category, date))
+                                      for category, date in zip(hit_rows["Category"].tolist(),
+                                                                hit_rows["Date"].tolist() if dated else [None] * hits.size)])
+            recorded_amounts = np.array([record["Amount"] for record in records])
+            recorded_currencies = np.array([record["Currency"] for record in records], dtype=object)
+            targets = hit_rows["Currency"].to_numpy(dtype=object)
+            for target in pd.unique(targets):
+                picked = targets == target
+                amounts[hits[picked]] += rates.convert(recorded_amounts[picked], recorded_currencies[picked],
+                                                       hit_rows["Date"].to_numpy()[picked] if dated else None, target)
+        rows["Amount"] = amounts
+    return rows, rows.iloc[:0]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from ledger import to_days
+
+# Rows shown per page of the expense log
+LOG_PAGE_ROWS = 50
+
+
+class ExpenseLogIndex:
+    """Search indexes over one view of the ledger, for the paginated expense log.
+
+    Built once per view. Categories are ranked in lower-cased sorted order, so
+    a category prefix is a contiguous range of ranks; each row stores its
+    category rank, and the rows sorted by rank map every category to its rows.
+    Dates and amounts are kept sorted alongside their row order the same way.
+    Every filter is then a pair of binary searches: the most selective one
+    picks the candidate rows and the others are checked on those rows only.
+    """
+
+    def __init__(self, expense_df):
+        self.expense_df = expense_df
+        codes, categories = pd.factorize(expense_df["Category"].astype(str).str.lower().to_numpy(dtype=object))
+        categories = categories.astype(str)
+        order = np.argsort(categories, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        self._categories = categories[order]
+
+        self._values = {"Category": rank[codes], "Amount": expense_df["Amount"].to_numpy(dtype=np.float64)}
+        if "Date" in expense_df.columns:
+            self._values["Date"] = to_days(expense_df["Date"]).view("datetime64[D]")
+        self._sorted = {}
+        for name, values in self._values.items():
+            rows = np.argsort(values, kind="stable")
+            self._sorted[name] = (values[rows], rows)
+
+    def _category_ranks(self, prefix):
+        # Inclusive rank range of the categories starting with ``prefix``
+        prefix = prefix.lower()
+        start = np.searchsorted(self._categories, prefix, side="left")
+        end = np.searchsorted(self._categories, prefix + "\U0010ffff", side="left")
+        return start, end - 1
+
+    def search(self, category_prefix="", date_range=None, amount_range=None):
+        """Row positions of the view matching every given filter, in view order.
+
+        ``date_range`` and ``amount_range`` are ``(low, high)`` pairs with
+        inclusive bounds, either of which may be None.
+        """
+        filters = {}
+        if category_prefix:
+            filters["Category"] = self._category_ranks(category_prefix)
+        if date_range is not None and "Date" in self._values:
+            filters["Date"] = tuple(None if bound is None else np.datetime64(bound, "D") for bound in date_range)
+        if amount_range is not None:
+            filters["Amount"] = amount_range
+        filters = {name: limits for name, limits in filters.items() if limits != (None, None)}
+        if not filters:
+            return np.arange(len(self.expense_df))
+
+        bounds = {}
+        for name, (low, high) in filters.items():
+            values = self._sorted[name][0]
+            start = 0 if low is None else np.searchsorted(values, low, side="left")
+            end = len(values) if high is None else np.searchsorted(values, high, side="right")
+            bounds[name] = (start, max(end, start))
+
+        # Materialize only the smallest candidate set, then check the other filters on it
+        smallest = min(bounds, key=lambda name: bounds[name][1] - bounds[name][0])
+        start, end = bounds[smallest]
+        rows = np.sort(self._sorted[smallest][1][start:end])
+        for name, (low, high) in filters.items():
+            if name == smallest:
+                continue
+            values = self._values[name][rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            rows = rows[mask]
+        return rows
+
+    def page(self, rows, page, page_rows=LOG_PAGE_ROWS):
+        # The requested 1-based page of matching rows; only these rows are formatted for display
+        start = (page - 1) * page_rows
+        return self.expense_df.iloc[rows[start:start + page_rows]]
@@ -0,0 +1,139 @@
+import datetime
+import pathlib
+import sqlite3
+import threading
+
+from currency import BASE_CURRENCY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    date TEXT NOT NULL DEFAULT '',
+    currency TEXT NOT NULL DEFAULT 'USD'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses (category, date);
+"""
+
+UPSERT_SQL = (
+    "INSERT INTO expenses (category, amount, date, currency) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (category, date) DO UPDATE SET amount = excluded.amount, currency = excluded.currency"
+)
+UPDATE_SQL = "UPDATE expenses SET amount = ?, currency = ? WHERE category = ? AND date = ?"
+DELETE_SQL = "DELETE FROM expenses WHERE category = ? AND date = ?"
+
+
+def _date_key(date):
+    # Undated ledgers (finance_manager) store '' so (category, date) stays unique per category
+    return date.isoformat() if date is not None else ""
+
+
+class ExpenseStore:
+    """SQLite-backed persistence for an ExpenseLedger.
+
+    Rows are unique on (category, date) through a composite index, so every
+    upsert, update and delete is an index lookup. Writes are queued and flushed
+    in a single transaction, either explicitly or once ``batch_size`` writes
+    are pending. The database runs in WAL mode so readers never block writers.
+
+    With ``readonly`` the database must already exist and is never changed:
+    no schema, migration or journal mode is applied, and writes fail.
+    """
+
+    def __init__(self, path, batch_size=500, readonly=False):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        # Databases created before expenses carried a currency hold amounts in the base currency
+        self._currency = "currency"
+        if readonly:
+            self._conn = sqlite3.connect(pathlib.Path(path).absolute().as_uri() + "?mode=ro", uri=True,
+                                         check_same_thread=False)
+            if "currency" not in self._columns():
+                self._currency = f"'{BASE_CURRENCY}'"
+            return
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if "currency" not in self._columns():
+            with self._conn:
+                self._conn.execute(f"ALTER TABLE expenses ADD COLUMN currency TEXT NOT NULL DEFAULT '{BASE_CURRENCY}'")
+
+    def _columns(self):
+        return {row[1] for row in self._conn.execute("PRAGMA table_info(expenses)")}
+
+    def load(self, ledger):
+        # Fill an empty ledger with every stored expense in insertion order
+        with self._lock:
+            rows = self._conn.execute(f"SELECT category, amount, {self._currency}, date FROM expenses ORDER BY id").fetchall()
+        categories, amounts, currencies, dates = zip(*rows) if rows else ((), (), (), ())
+        columns = {"Category": categories, "Amount": amounts}
+        if "Currency" in ledger.columns:
+            columns["Currency"] = currencies
+        if "Date" in ledger.columns:
+            columns["Date"] = [datetime.date.fromisoformat(date) if date else None for date in dates]
+        ledger.extend(**columns)
+        return ledger
+
+    def totals(self):
+        # (row count, amount in integer cents) of every stored expense, queued writes included
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(CAST(ROUND(amount * 100) AS INTEGER)), 0) FROM expenses").fetchone()
+
+    def _queue(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def upsert(self, category, amount, date=None, currency=BASE_CURRENCY):
+        self._queue(UPSERT_SQL, (category, float(amount), _date_key(date), currency))
+
+    def upsert_many(self, categories, amounts, dates=None, currencies=None):
+        if dates is None:
+            dates = [None] * len(categories)
+        if currencies is None:
+            currencies = [BASE_CURRENCY] * len(categories)
+        rows = [(category, float(amount), _date_key(date), currency)
+                for category, amount, date, currency in zip(categories, amounts, dates, currencies)]
+        with self._lock:
+            self._pending.extend((UPSERT_SQL, row) for row in rows)
+            self._flush_locked()
+
+    def update(self, category, amount, date=None, currency=BASE_CURRENCY):
+        self._queue(UPDATE_SQL, (float(amount), currency, category, _date_key(date)))
+
+    def delete(self, category, date=None):
+        self._queue(DELETE_SQL, (category, _date_key(date)))
+
+    def apply_change(self, before, after):
+        # Mirror one ledger change given as (before, after) row dicts, e.g. an undo from ExpenseJournal
+        if before is not None and (after is None or (before["Category"], before.get("Date")) != (after["Category"], after.get("Date"))):
+            self.delete(before["Category"], before.get("Date"))
+        if after is not None:
+            self.upsert(after["Category"], after["Amount"], after.get("Date"), after.get("Currency", BASE_CURRENCY))
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self._conn:
+            # Consecutive writes of the same kind go through a single executemany
+            start = 0
+            for end in range(1, len(pending) + 1):
+                if end == len(pending) or pending[end][0] != pending[start][0]:
+                    self._conn.executemany(pending[start][0], [params for _, params in pending[start:end]])
+                    start = end
+
+    def close(self):
+        self.flush()
+        self._conn.close()
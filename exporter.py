@@ -0,0 +1,142 @@
+import gzip
+import io
+import tempfile
+
+import pandas as pd
+
+# Display name -> (file extension, content type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "JSON": ("json", "application/json"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Feather": ("feather", "application/vnd.apache.arrow.file"),
+}
+
+# Rows serialized per chunk, and how much output stays in memory before it spills to a temp file
+CHUNK_ROWS = 50_000
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _chunks(expense_df, chunk_rows):
+    for start in range(0, max(len(expense_df), 1), chunk_rows):
+        yield expense_df.iloc[start:start + chunk_rows]
+
+
+def _write_csv(expense_df, out, chunk_rows):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    for i, chunk in enumerate(_chunks(expense_df, chunk_rows)):
+        chunk.to_csv(text, index=False, header=i == 0)
+    text.flush()
+    text.detach()
+
+
+def _write_csv_gzip(expense_df, out, chunk_rows):
+    with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+        _write_csv(expense_df, compressed, chunk_rows)
+
+
+def _write_json(expense_df, out, chunk_rows):
+    # One JSON array of records, stitched together from per-chunk arrays
+    out.write(b"[")
+    first = True
+    for chunk in _chunks(expense_df, chunk_rows):
+        records = chunk.to_json(orient="records", date_format="iso")[1:-1]
+        if records:
+            if not first:
+                out.write(b",")
+            out.write(records.encode("utf-8"))
+            first = False
+    out.write(b"]")
+
+
+def _write_excel(expense_df, out, chunk_rows):
+    from openpyxl import Workbook
+
+    # Write-only workbooks stream rows instead of holding a cell object per value
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(expense_df.columns))
+    dates = [name for name, dtype in expense_df.dtypes.items() if dtype.kind == "M"]
+    for chunk in _chunks(expense_df, chunk_rows):
+        # Plain dates write faster than Timestamps, and come out as date cells
+        chunk = chunk.assign(**{name: chunk[name].dt.date for name in dates})
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(out)
+
+
+def _arrow_tables(expense_df, chunk_rows):
+    import pyarrow as pa
+
+    # Categoricals go out as plain strings: every chunk would otherwise carry the full
+    # dictionary, and Feather files cannot change dictionaries between batches
+    categoricals = {name: object for name, dtype in expense_df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+    # The first chunk fixes the schema so every later chunk converts to the same types
+    schema = None
+    for chunk in _chunks(expense_df, chunk_rows):
+        table = pa.Table.from_pandas(chunk.astype(categoricals), schema=schema, preserve_index=False)
+        schema = table.schema
+        yield table
+
+
+def _write_parquet(expense_df, out, chunk_rows):
+    import pyarrow.parquet as pq
+
+    writer = None
+    for table in _arrow_tables(expense_df, chunk_rows):
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema, compression="snappy")
+        writer.write_table(table)
+    writer.close()
+
+
+def _write_feather(expense_df, out, chunk_rows):
+    import pyarrow as pa
+
+    writer = None
+    for table in _arrow_tables(expense_df, chunk_rows):
+        if writer is None:
+            writer = pa.ipc.new_file(out, table.schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+        writer.write_table(table)
+    writer.close()
+
+
+_WRITERS = {
+    "CSV": _write_csv,
+    "CSV (gzip)": _write_csv_gzip,
+    "Excel": _write_excel,
+    "JSON": _write_json,
+    "Parquet": _write_parquet,
+    "Feather": _write_feather,
+}
+
+
+def write_export(expense_df, export_format, out, chunk_rows=CHUNK_ROWS):
+    # Serialize the ledger into a binary file-like object, one chunk at a time
+    if export_format not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    if export_format == "Excel" and len(expense_df) >= 1_048_576:
+        raise ValueError("Excel sheets are limited to 1,048,575 expense rows.")
+    _WRITERS[export_format](expense_df, out, chunk_rows)
+
+
+def stream_export(expense_df, export_format, chunk_rows=CHUNK_ROWS, max_memory=SPOOL_MAX_BYTES):
+    """Export into a spooled temp file and return ``(file, file_name, content_type)``.
+
+    Output stays in memory up to ``max_memory`` bytes and spills to an
+    anonymous temp file beyond that, so nothing is written to a shared path
+    and serializing a large ledger stays within a fixed memory budget. The
+    returned file is rewound and owned by the caller; reading it whole (as
+    the apps do for st.download_button) costs its full size.
+    """
+    file_extension, file_content_type = EXPORT_FORMATS[export_format]
+    export_file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        write_export(expense_df, export_format, export_file, chunk_rows)
+    except BaseException:
+        export_file.close()
+        raise
+    export_file.seek(0)
+    return export_file, f"expenses.{file_extension}", file_content_type
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+# pyplot keeps global state (the current figure), so Matplotlib charts built off the main thread hold this lock
+PYPLOT_LOCK = threading.Lock()
+
+
+class FigureCache:
+    """LRU cache for chart figures and their rendered PNG bytes.
+
+    Keys combine the ledger's data version with every other chart input
+    (income, currency, ...), so a rerun that changes none of them reuses the
+    previous figures instead of rebuilding them. The least recently used entry
+    is evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_or_build(self, key, build):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        value = build()
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+def chart_png(chart):
+    # PNG bytes of a Matplotlib figure; already-rendered bytes pass straight through
+    if isinstance(chart, bytes):
+        return chart
+    image = BytesIO()
+    chart.savefig(image, format="png")
+    return image.getvalue()
+
+
+def render_pngs(*figures):
+    # Render Matplotlib figures to PNG bytes and release them from pyplot
+    import matplotlib.pyplot as plt
+
+    pngs = tuple(chart_png(figure) for figure in figures)
+    for figure in figures:
+        plt.close(figure)
+    return pngs
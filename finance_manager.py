@@ -1,41 +1,43 @@
+# Plotly, Matplotlib/Seaborn and ReportLab are imported inside the functions that use
+# them, so a cold start or script reload does not pay for them until they are needed
+# (checked by benchmarks/check_import_time.py)
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pyttsx3
-import plotly.express as px
-from gtts import gTTS
 from io import BytesIO
-import base64
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Spacer, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-
+import os
+from ledger import ExpenseLedger
+from expense_store import ExpenseStore
+from journal import ExpenseJournal
+from figure_cache import PYPLOT_LOCK, FigureCache, chart_png, render_pngs
+from exporter import EXPORT_FORMATS, stream_export
+from pdf_report import REPORT_DETAILS, expense_tables
+from speech import audio_format, request_speech
+from jobs import JobRunner, job_status
+from currency import BASE_CURRENCY, RATES_PATH, RateTable, base_rates, reporting_total, reporting_view
+from expense_log import LOG_PAGE_ROWS, ExpenseLogIndex
+from categories import chart_categories
+from dedup import DEDUP_POLICIES, resolve_expense
+from metrics import metrics
+
+# How often a pending export, report or audio job is checked, without rerunning the whole page
+JOB_POLL_SECONDS = 1
+
+DB_PATH = os.environ.get("FINANCE_MANAGER_DB", "finance.db")
+JOURNAL_PATH = os.environ.get("FINANCE_MANAGER_JOURNAL", "finance.journal")
+
+@metrics.timed()
 def export_data(expense_df, export_format):
-    if export_format == "CSV":
-        file_extension = "csv"
-        file_content_type = "text/csv"
-        file_name = "expenses.csv"
-        expense_df.to_csv(file_name, index=False)
-    elif export_format == "Excel":
-        file_extension = "xlsx"
-        file_content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        file_name = "expenses.xlsx"
-        expense_df.to_excel(file_name, index=False)
-    elif export_format == "JSON":
-        file_extension = "json"
-        file_content_type = "application/json"
-        file_name = "expenses.json"
-        expense_df.to_json(file_name, orient="records")
-
-    # Provide download link for the exported file
-    with open(file_name, "rb") as f:
-        file_data = f.read()
-    b64_file = base64.b64encode(file_data).decode("utf-8")
-    download_link = f'<a href="data:{file_content_type};base64,{b64_file}" download="{file_name}">Download {export_format} File</a>'
-    st.markdown(download_link, unsafe_allow_html=True)
-
-def generate_visualizations(expense_df, income=0, total_expenses=0, total_balance=0):
+    # Stream the export into a per-call spooled buffer instead of a shared file on disk, and
+    # return (bytes, file name, content type) for the download button, which needs the whole
+    # file in memory; runs as a background job, whose result the session's JobRunner caches
+    export_file, file_name, file_content_type = stream_export(expense_df, export_format)
+    with export_file:
+        return export_file.read(), file_name, file_content_type
+
+@metrics.timed()
+def generate_visualizations(expense_df, income=0, total_expenses=0, total_balance=0, category_amounts=None):
+    import plotly.express as px
+
     # Bar Graph
     data = pd.DataFrame({
         "Category": ["Total Income", "Total Expenses", "Total Balance"],
@@ -47,13 +49,21 @@ def generate_visualizations(expense_df, income=0, total_expenses=0, total_balanc
                  labels={"Amount": "Amount", "Category": ""},
                  title="Finance Summary")
 
-    category_amounts = expense_df.groupby("Category")["Amount"].sum().reset_index()
+    # Per-category sums come from the ledger aggregates when the caller has them
+    if category_amounts is None:
+        category_amounts = expense_df.groupby("Category", observed=True)["Amount"].sum()
+    # The largest categories get a slice each, the rest are drawn as one "Other" slice
+    category_amounts = chart_categories(category_amounts).reset_index()
     expenses_breakdown_fig = px.pie(category_amounts, values="Amount", names="Category",
                                      title="Expenses Breakdown", hole=0.3)
     
     return finance_summary_fig, expenses_breakdown_fig
 
-def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance):
+@metrics.timed()
+def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance, category_amounts=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Bar Graph
     bar_chart_fig, ax = plt.subplots(figsize=(8, 6))
     data = {
@@ -68,15 +78,28 @@ def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance
 
     # Pie chart
     pie_chart_fig, ax = plt.subplots(figsize=(8, 6))
-    category_amounts = expense_df.groupby("Category")["Amount"].sum()
-    ax.pie(category_amounts, labels=category_amounts.index, autopct="%1.1f%%", startangle=90)
-    ax.axis("equal")
+    if category_amounts is None:
+        category_amounts = expense_df.groupby("Category", observed=True)["Amount"].sum()
+    category_amounts = chart_categories(category_amounts)
+    if category_amounts.sum() > 0:
+        ax.pie(category_amounts, labels=category_amounts.index, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+    else:
+        # Matplotlib cannot draw a pie of no (or only zero) amounts
+        ax.text(0.5, 0.5, "No expenses", ha="center", va="center", fontsize=14)
+        ax.axis("off")
     plt.title("Expenses Breakdown")
     plt.tight_layout()
 
     return bar_chart_fig, pie_chart_fig
 
-def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig, incurrency):
+@metrics.timed()
+def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig, incurrency,
+                      detail="rows", output_path=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Spacer, Paragraph
+
     # Create PDF document
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
@@ -105,49 +128,134 @@ def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_cha
     content.append(table)
     content.append(Spacer(1, 24))
 
-    # Add bar chart
-    bar_chart_image = BytesIO()
-    bar_chart_fig.savefig(bar_chart_image, format="png")
+    # Add bar chart (a Matplotlib figure or its cached PNG bytes)
+    bar_chart_image = BytesIO(chart_png(bar_chart_fig))
     bar_chart_img = Image(bar_chart_image, width=400, height=300)
     content.append(bar_chart_img)
     content.append(Spacer(1, 12))
 
     # Add pie chart
-    pie_chart_image = BytesIO()
-    pie_chart_fig.savefig(pie_chart_image, format="png")
+    pie_chart_image = BytesIO(chart_png(pie_chart_fig))
     pie_chart_img = Image(pie_chart_image, width=400, height=300)
     content.append(pie_chart_img)
     content.append(Spacer(1, 12))
 
-    # Create Table object
-    table_data = [["Category", "Amount"]]
-    for _, row in expense_df.iterrows():
-        table_data.append([row["Category"], f"{incurrency}{row['Amount']:.2f}"])
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), "grey"),
-        ("TEXTCOLOR", (0, 0), (-1, 0), (1, 1, 1)),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-        ("BACKGROUND", (0, 1), (-1, -1), (0.95, 0.95, 0.95)),
-        ("GRID", (0, 0), (-1, -1), 1, (0.75, 0.75, 0.75)),
-    ]))
-    content.append(table)
+    # Create paginated Table objects (every row, or per category totals)
+    content.extend(expense_tables(expense_df, incurrency, detail))
 
     # Build PDF content
     doc.build(content)
 
-    # Save PDF
+    # Return the PDF bytes, saving them only when the caller asks for a file
     pdf_data = buffer.getvalue()
-    with open("finance_report.pdf", "wb") as f:
-        f.write(pdf_data)
-
-def get_download_link(file_path, link_text):
-    with open(file_path, "rb") as f:
-        pdf_data = f.read()
-    b64_pdf = base64.b64encode(pdf_data).decode("utf-8")
-    return f'<a href="data:application/pdf;base64,{b64_pdf}" download="{file_path}" target="_blank">{link_text}</a>'
+    if output_path is not None:
+        with open(output_path, "wb") as f:
+            f.write(pdf_data)
+    return pdf_data
+
+@metrics.timed()
+def add_expense(ledger, income, expense_category, expense_amount, store=None,
+                expense_currency=BASE_CURRENCY, rates=None, incurrency=BASE_CURRENCY, policy="reject"):
+    # Validate against negative values and the balance (in the reporting currency), and handle a
+    # duplicate category per ``policy`` (see DEDUP_POLICIES); returns a warning message, or None once the expense is added
+    rates = rates if rates is not None else base_rates()
+    try:
+        total_balance = income - reporting_total(ledger, rates, incurrency)
+        resolved = resolve_expense(ledger, policy, expense_category, expense_amount, expense_currency, rates=rates)
+        category, amount, currency = resolved or (expense_category, expense_amount, expense_currency)
+        # Merged or summed expenses only add their difference to the existing entry
+        existing_index = ledger.lookup(Category=category)
+        old_amount = 0.0 if existing_index is None else rates.convert_one(
+            ledger.get(existing_index, "Amount"), ledger.get(existing_index, "Currency"), None, incurrency)
+        converted_amount = rates.convert_one(amount, currency, None, incurrency)
+    except ValueError as error:
+        return str(error)
+    if expense_amount < 0:
+        return "Expense amount cannot be negative."
+    if converted_amount - old_amount > total_balance:
+        return "Expense amount cannot exceed total balance."
+    if resolved is None:
+        return "Expense category already exists. Consider updating the existing entry."
+    ledger.upsert(Category=category, Amount=amount, Currency=currency)
+    if store is not None:
+        store.upsert(category, amount, currency=currency)
+    return None
+
+@metrics.timed()
+def update_expense(ledger, income, expense_category, new_amount, store=None,
+                   expense_currency=None, rates=None, incurrency=BASE_CURRENCY):
+    # expense_currency None keeps the currency the expense was recorded in
+    rates = rates if rates is not None else base_rates()
+    selected_index = ledger.lookup(Category=expense_category)
+    if selected_index is None:
+        return "Expense category does not exist."
+    if expense_currency is None:
+        expense_currency = ledger.get(selected_index, "Currency")
+    # Calculate the maximum allowable change in the expense amount (in the reporting currency)
+    try:
+        old_amount = rates.convert_one(ledger.get(selected_index, "Amount"), ledger.get(selected_index, "Currency"), None, incurrency)
+        max_change = income - reporting_total(ledger, rates, incurrency) + old_amount
+        converted_amount = rates.convert_one(new_amount, expense_currency, None, incurrency)
+    except ValueError as error:
+        return str(error)
+    if new_amount < 0:
+        return "Expense amount cannot be negative."
+    if converted_amount > max_change:
+        return "Updated amount cannot exceed the remaining balance after considering the old amount."
+    # One upsert, so the journal records the update as a single undo step
+    ledger.upsert(Category=expense_category, Amount=new_amount, Currency=expense_currency)
+    if store is not None:
+        store.update(expense_category, new_amount, currency=expense_currency)
+    return None
+
+@metrics.timed()
+def delete_expense(ledger, expense_category, store=None):
+    selected_index = ledger.lookup(Category=expense_category)
+    if selected_index is None:
+        return "Expense category does not exist."
+    ledger.delete(selected_index)
+    if store is not None:
+        store.delete(expense_category)
+    return None
+
+@metrics.timed()
+def build_pdf_report(expense_df, income, total_expenses, total_balance, category_amounts, incurrency, detail):
+    # Background job: chart PNGs and PDF bytes; only one thread at a time may draw with pyplot
+    with PYPLOT_LOCK:
+        bar_chart_png, pie_chart_png = render_pngs(*generate_pdfvisualizations(
+            expense_df, income, total_expenses, total_balance, category_amounts))
+    return create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_png, pie_chart_png,
+                             incurrency, detail)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_job(jobs, key, label):
+    # Reruns on its own while the job is pending, then reruns the page to show the result
+    if job_status(jobs.get(key)) in ("queued", "running"):
+        st.info(f"{label}...")
+    else:
+        st.rerun()
+
+def job_result(jobs, key, label):
+    # The finished artifact of a job; None while it is pending (polled above), failed or never submitted
+    future = jobs.get(key)
+    status = job_status(future)
+    if status in ("queued", "running"):
+        poll_job(jobs, key, label)
+    elif status == "failed":
+        st.warning(f"{label} failed: {future.exception()}")
+    elif status == "done":
+        return future.result()
+    return None
+
+def undo_change(journal, store, redo=False):
+    # Undo / Redo callback; it runs before the rerun, so both buttons render with the new journal state
+    for before, after in (journal.redo() if redo else journal.undo()):
+        store.apply_change(before, after)
+    store.flush()
+
+@st.cache_resource
+def get_expense_store(path):
+    return ExpenseStore(path)
 
 def main():
     st.title("Personal Finance Manager")
@@ -165,32 +273,49 @@ def main():
         st.warning("Income cannot be negative.")
         return
 
-    # Initialize or load the expense DataFrame
-    if 'expense_df' not in st.session_state:
-        st.session_state.expense_df = pd.DataFrame(columns=["Category", "Amount"])
+    # Initialize the expense ledger once per session: the latest journal snapshot plus the changes
+    # journaled after it, or the database when there is no journal yet or it no longer matches the database
+    store = get_expense_store(DB_PATH)
+    if 'ledger' not in st.session_state:
+        st.session_state.journal = ExpenseJournal(JOURNAL_PATH)
+        st.session_state.ledger = st.session_state.journal.restore(
+            ExpenseLedger(columns=["Category", "Amount", "Currency"], key=["Category"]), seed=store.load,
+            totals=store.totals)
+    ledger = st.session_state.ledger
+    journal = st.session_state.journal
+    figure_cache = st.session_state.setdefault("figure_cache", FigureCache())
+    jobs = st.session_state.setdefault("jobs", JobRunner())
+
+    # Exchange rates, stored locally and editable here; undated expenses convert at the latest rate
+    if 'rates' not in st.session_state:
+        st.session_state.rates = RateTable.load(RATES_PATH)
+    rates = st.session_state.rates
+    with st.expander("Exchange Rates"):
+        st.caption(f"Units of each currency per 1 {BASE_CURRENCY}, in effect from the given date.")
+        edited_rates = st.data_editor(rates.rates, num_rows="dynamic", key="rates_editor")
+        if st.button("Save Rates", key="save_rates"):
+            try:
+                st.session_state.rates = rates = RateTable(edited_rates)
+            except ValueError as error:
+                st.warning(str(error))
+            else:
+                rates.save(RATES_PATH)
+                st.success("Exchange rates saved.")
 
     # Input for Expenses
     st.header("Expenses")
     expense_category = st.text_input("Enter expense category:", key="expense_category")
     expense_amount = st.number_input("Enter expense amount:", value=0.0, step=1.0, key="expense_amount")
-    add_expense = st.button("Add Expense", key="add_expense")
+    expense_currency = st.selectbox("Expense currency:", currency, index=currency.index(incurrency), key="expense_currency")
+    dedup_policy = st.selectbox("Duplicate entries:", list(DEDUP_POLICIES), key="dedup_policy")
+    add_button = st.button("Add Expense", key="add_expense")
 
-    total_expenses = st.session_state.expense_df["Amount"].sum()
-    total_balance = income - total_expenses
-
-    # Add expense to the DataFrame if the button is clicked and validate against negative values and balance
-    if add_expense:
-        if expense_amount < 0:
-            st.warning("Expense amount cannot be negative.")
-        elif expense_amount > total_balance:
-            st.warning("Expense amount cannot exceed total balance.")
-        else:
-            # Check if the category already exists in the DataFrame
-            if expense_category in st.session_state.expense_df["Category"].values:
-                st.warning("Expense category already exists. Consider updating the existing entry.")
-            else:
-                new_expense = pd.DataFrame({"Category": [expense_category], "Amount": [expense_amount]})
-                st.session_state.expense_df = pd.concat([st.session_state.expense_df, new_expense], ignore_index=True)
+    # Add expense to the ledger if the button is clicked
+    if add_button:
+        warning = add_expense(ledger, income, expense_category, expense_amount, store, expense_currency, rates, incurrency,
+                              DEDUP_POLICIES[dedup_policy])
+        if warning:
+            st.warning(warning)
 
     st.subheader("Manage Expenses")
 
@@ -199,59 +324,101 @@ def main():
 
     if selected_operation == "Update":
       # Select a row to update
-      selected_row = st.selectbox("Select a row to update:", st.session_state.expense_df["Category"], key="update_selected_row")
+      selected_row = st.selectbox("Select a row to update:", ledger.column("Category"), key="update_selected_row")
       new_amount = st.number_input("Enter updated amount:", value=0.0, step=1.0)
-    
-      old_amount = st.session_state.expense_df.loc[
-          st.session_state.expense_df["Category"] == selected_row, "Amount"].values[0]
-    
-      # Calculate the maximum allowable change in the expense amount
-      max_change = total_balance + old_amount
-    
+      # Defaults to the currency the selected expense was recorded in, not the one picked for new expenses
+      recorded_index = ledger.lookup(Category=selected_row) if selected_row is not None else None
+      recorded_currency = ledger.get(recorded_index, "Currency") if recorded_index is not None else incurrency
+      update_currency = st.selectbox("Updated currency:", currency,
+                                     index=currency.index(recorded_currency) if recorded_currency in currency else 0,
+                                     key=f"update_currency_{selected_row}")
       update_button = st.button("Update", key="update_button")
-    
-      if update_button:
-          if new_amount < 0:
-              st.warning("Expense amount cannot be negative.")
-          elif new_amount > max_change:
-              st.warning("Updated amount cannot exceed the remaining balance after considering the old amount.")
-          else:
-              st.session_state.expense_df.loc[st.session_state.expense_df["Category"] == selected_row, "Amount"] = new_amount
-              total_expenses = st.session_state.expense_df["Amount"].sum()
-              total_balance = income - total_expenses
+
+      if update_button and selected_row is not None:
+          warning = update_expense(ledger, income, selected_row, new_amount, store, update_currency, rates, incurrency)
+          if warning:
+              st.warning(warning)
 
 
     elif selected_operation == "Delete":
         # Select a row to delete
-        selected_row = st.selectbox("Select a row to delete:", st.session_state.expense_df["Category"], key="delete_selected_row")
+        selected_row = st.selectbox("Select a row to delete:", ledger.column("Category"), key="delete_selected_row")
         delete_button = st.button("Delete", key="delete_button")
-        if delete_button:
-            st.session_state.expense_df = st.session_state.expense_df[st.session_state.expense_df["Category"] != selected_row]
-
-    total_expenses = st.session_state.expense_df["Amount"].sum()
+        if delete_button and selected_row is not None:
+            delete_expense(ledger, selected_row, store)
+
+    # Step back and forth through journaled changes; the database follows the ledger
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        st.button("Undo", key="undo", disabled=not journal.can_undo, on_click=undo_change, args=(journal, store))
+    with redo_col:
+        st.button("Redo", key="redo", disabled=not journal.can_redo, on_click=undo_change, args=(journal, store, True))
+
+    store.flush()
+
+    # View of the ledger converted into the selected currency; totals come from the ledger
+    # aggregates when no conversion is needed, otherwise from one vectorized pass
+    view_key = (ledger.version, incurrency, rates.key)
+    try:
+        with metrics.span("view", len(ledger)):
+            expense_df, total_expenses, category_amounts, _ = figure_cache.get_or_build(
+                ("view",) + view_key, lambda: reporting_view(ledger, rates, incurrency))
+    except ValueError as error:
+        # Fall back to the base currency, which only needs rates for expenses recorded in other currencies
+        if incurrency == BASE_CURRENCY:
+            st.warning(f"{error} Add it under Exchange Rates.")
+            return
+        st.warning(f"{error} Add it under Exchange Rates; amounts are shown in {BASE_CURRENCY} meanwhile.")
+        incurrency = BASE_CURRENCY
+        view_key = (ledger.version, incurrency, rates.key)
+        try:
+            expense_df, total_expenses, category_amounts, _ = figure_cache.get_or_build(
+                ("view",) + view_key, lambda: reporting_view(ledger, rates, incurrency))
+        except ValueError:
+            return
     total_balance = income - total_expenses
-    
+
+    # Figures are only rebuilt when the ledger, the income or the currency changes
+    if not ledger.empty:
+        finance_summary_fig, expenses_breakdown_fig = figure_cache.get_or_build(
+            ("plotly", income) + view_key,
+            lambda: generate_visualizations(expense_df, income, total_expenses, total_balance, category_amounts))
+
     # Create dashboard layout with columns
     col1, col2 = st.columns(2)
 
     with col1:
         # Display Expense Log
         st.header("Expense Log")
-        if not st.session_state.expense_df.empty:
-            st.text(st.session_state.expense_df.to_string(index=False))
+        if not ledger.empty:
+            # Filters are served from indexes built once per view; only the visible page is formatted
+            log_index = figure_cache.get_or_build(("log",) + view_key, lambda: ExpenseLogIndex(expense_df))
+            category_prefix = st.text_input("Category starts with:", key="log_category")
+            min_amount, max_amount = st.columns(2)
+            with min_amount:
+                min_amount = st.number_input("Min amount:", value=None, key="log_min_amount")
+            with max_amount:
+                max_amount = st.number_input("Max amount:", value=None, key="log_max_amount")
+            with metrics.span("log_search", len(expense_df)):
+                rows = log_index.search(category_prefix, amount_range=(min_amount, max_amount))
+
+            pages = max(-(-len(rows) // LOG_PAGE_ROWS), 1)
+            if st.session_state.get("log_page", 1) > pages:
+                st.session_state.log_page = pages
+            page = st.number_input("Page:", min_value=1, max_value=pages, value=1, step=1, key="log_page")
+            st.dataframe(log_index.page(rows, page), hide_index=True)
+            st.caption(f"{len(rows)} expenses, page {page} of {pages}")
 
     with col2:
         # Visualization: Expenses Breakdown - Pie Chart
         st.header("Expenses Breakdown")
-        if not st.session_state.expense_df.empty:
-            _, expenses_breakdown_fig = generate_visualizations(st.session_state.expense_df)
+        if not ledger.empty:
             st.plotly_chart(expenses_breakdown_fig)
         
 
     # Visualization: Finance Summary - Bar Chart
     st.header("Finance Summary")
-    if not st.session_state.expense_df.empty:
-        finance_summary_fig, _ = generate_visualizations(st.session_state.expense_df, income, total_expenses, total_balance)
+    if not ledger.empty:
         st.plotly_chart(finance_summary_fig)
         
 
@@ -261,32 +428,58 @@ def main():
     st.write(f"Total Expenses: {incurrency} {total_expenses:.2f}")
     st.write(f"Total Balance: {incurrency} {total_balance:.2f}")
     
-    export_format = st.selectbox("Select export format:", ["CSV", "Excel", "JSON"])
-    export_button = st.button("Export Data")
-    
-    if export_button:
-        if not st.session_state.expense_df.empty:
-            export_data(st.session_state.expense_df, export_format)
-            st.success(f"Data exported as {export_format} successfully!")
+    # Exports, audio and reports build in the background, keyed like the figures; the page stays
+    # usable meanwhile, and a repeat click joins the running job or reuses its finished artifact
+    export_format = st.selectbox("Select export format:", list(EXPORT_FORMATS))
+    export_key = ("export", export_format) + view_key
+    if st.button("Export Data"):
+        if expense_df.empty:
+            st.info("No expenses to export.")
+        else:
+            jobs.submit(export_key, export_data, expense_df, export_format)
+    export = job_result(jobs, export_key, f"Exporting {export_format}")
+    if export is not None:
+        export_bytes, file_name, file_content_type = export
+        st.success(f"Data exported as {export_format} successfully!")
+        st.download_button(f"Download {export_format} File", export_bytes, file_name=file_name, mime=file_content_type)
 
     colm1, colm2= st.columns(2)
     with colm1:
+      speech_key = ("speech",) + view_key
       explain_expenses = st.button("Explain Expenses", key="Explain_Expenses")
       if explain_expenses:
           text_to_speech = "Here are your expenses:\n"
-          for _, row in st.session_state.expense_df.iterrows():
-            text_to_speech += f"For {row['Category']}, you spent {incurrency} {row['Amount']:.2f}\n"
+          for category, amount in category_amounts.items():
+            text_to_speech += f"For {category}, you spent {incurrency} {amount:.2f}\n"
           text_to_speech += f"Your total expenses are {incurrency} {total_expenses:.2f}"
-          tts = gTTS(text_to_speech)
-          tts.save("expenses.mp3")
-
-          st.audio("expenses.mp3")
+          # Synthesized offline on the speech worker and cached on disk by text
+          jobs.track(speech_key, request_speech(text_to_speech))
+      audio_path = job_result(jobs, speech_key, "Preparing audio")
+      if audio_path is not None:
+          st.audio(audio_path, format=audio_format(audio_path))
     with colm2:
-      if st.button("Generate PDF Report") and not st.session_state.expense_df.empty:
-            bar_chart_fig, pie_chart_fig = generate_pdfvisualizations(st.session_state.expense_df, income, total_expenses, total_balance)
-            create_pdf_report(st.session_state.expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig,incurrency)
+      # Finance ledgers are undated, so there is no per-month summary
+      report_detail = st.selectbox("Report detail:", [detail for detail in REPORT_DETAILS if detail != "By month"], key="report_detail")
+      pdf_key = ("pdf", income, report_detail) + view_key
+      if st.button("Generate PDF Report"):
+            if expense_df.empty:
+                st.info("No expenses to report.")
+            else:
+                jobs.submit(pdf_key, build_pdf_report, expense_df, income, total_expenses, total_balance,
+                            category_amounts, incurrency, REPORT_DETAILS[report_detail])
+      pdf_data = job_result(jobs, pdf_key, "Building PDF report")
+      if pdf_data is not None:
             st.success("PDF Report generated successfully!")
-            st.markdown(get_download_link("finance_report.pdf", "Download PDF Report"), unsafe_allow_html=True)
+            st.download_button("Download PDF Report", pdf_data, file_name="finance_report.pdf", mime="application/pdf")
+
+    # Rolling stage timings, when FINANCE_METRICS_PATH switches the recorder on
+    if metrics.enabled:
+        with st.expander("Stage Timings"):
+            st.dataframe(pd.DataFrame.from_dict(metrics.summary(), orient="index"))
 
 if __name__ == "__main__":
-    main()
+    try:
+        with metrics.span("rerun"):
+            main()
+    finally:
+        metrics.flush()
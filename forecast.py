@@ -0,0 +1,256 @@
+import datetime
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from categories import fold
+from currency import BASE_CURRENCY
+
+# Recurring expenses (Category,Amount,Currency,Frequency,Start,End) and monthly budgets (Category,Budget,Currency)
+RECURRING_PATH = os.environ.get("RECURRING_EXPENSES_PATH", "recurring.csv")
+BUDGETS_PATH = os.environ.get("BUDGETS_PATH", "budgets.csv")
+
+# Frequency -> (unit, step): an occurrence every ``step`` days ("D") or calendar months ("M")
+FREQUENCIES = {
+    "Daily": ("D", 1),
+    "Weekly": ("D", 7),
+    "Biweekly": ("D", 14),
+    "Monthly": ("M", 1),
+    "Quarterly": ("M", 3),
+    "Yearly": ("M", 12),
+}
+
+# Calendar months projected, the current one included
+FORECAST_MONTHS = 12
+MAX_FORECAST_MONTHS = 120
+
+RECURRING_COLUMNS = ["Category", "Amount", "Currency", "Frequency", "Start", "End"]
+BUDGET_COLUMNS = ["Category", "Budget", "Currency"]
+
+
+def _text(values):
+    # Stripped strings, with blanks turned into missing values
+    values = pd.Series(values, dtype=object).astype("string").str.strip()
+    return values.mask(values == "")
+
+
+def _month_days(months):
+    # Day number of the first day of each month number (months since the epoch)
+    return np.asarray(months, dtype=np.int64).astype("datetime64[M]").astype("datetime64[D]").view(np.int64)
+
+
+def _expand(counts):
+    # Item index and 0-based position of every occurrence, laid out flat by a cumulative sum of the counts
+    items = np.repeat(np.arange(len(counts)), counts)
+    firsts = np.cumsum(counts) - counts
+    return items, np.arange(len(items)) - firsts[items]
+
+
+class ForecastPlan:
+    """Recurring expenses and monthly category budgets, projected with array arithmetic.
+
+    ``recurring`` rows are (Category, Amount, Currency, Frequency, Start, End):
+    an expense repeating at one of FREQUENCIES from Start, up to and including
+    End when one is given. Monthly and less frequent items fall on Start's day
+    of the month, or the month's last day when it is shorter. ``budgets`` rows
+    are (Category, Budget, Currency), a monthly spending limit per category;
+    categories are matched like the breakdown charts group them (``fold``).
+
+    ``project()`` works on whole arrays: occurrence counts per item come from
+    day and month arithmetic on ``datetime64`` numbers, per-day spend of the
+    items repeating every few days from difference arrays and cumulative
+    sums, and ``np.bincount`` / ``np.cumsum`` turn those into the monthly
+    balance and the budget burn. The cost grows with the number of items and
+    days in the window, never with items times days.
+    """
+
+    def __init__(self, recurring=None, budgets=None):
+        if recurring is None:
+            recurring = pd.DataFrame({column: [] for column in RECURRING_COLUMNS})
+        if budgets is None:
+            budgets = pd.DataFrame({column: [] for column in BUDGET_COLUMNS})
+        recurring = pd.DataFrame({
+            "Category": _text(recurring["Category"]),
+            "Amount": pd.to_numeric(pd.Series(recurring["Amount"], dtype=object), errors="coerce"),
+            "Currency": _text(recurring["Currency"]).str.upper().fillna(BASE_CURRENCY),
+            "Frequency": _text(recurring["Frequency"]).str.capitalize().fillna("Monthly"),
+            "Start": pd.to_datetime(pd.Series(recurring["Start"], dtype=object)).dt.normalize(),
+            "End": pd.to_datetime(pd.Series(recurring["End"], dtype=object)).dt.normalize(),
+        }).dropna(subset=["Category", "Amount", "Start"])
+        unknown = sorted(set(recurring["Frequency"]) - set(FREQUENCIES))
+        if unknown:
+            raise ValueError(f"Unknown frequency: {', '.join(unknown)}. Use one of {', '.join(FREQUENCIES)}.")
+        if (recurring["Amount"] < 0).any():
+            raise ValueError("Recurring expense amounts cannot be negative.")
+        budgets = pd.DataFrame({
+            "Category": _text(budgets["Category"]),
+            "Budget": pd.to_numeric(pd.Series(budgets["Budget"], dtype=object), errors="coerce"),
+            "Currency": _text(budgets["Currency"]).str.upper().fillna(BASE_CURRENCY),
+        }).dropna()
+        if (budgets["Budget"] < 0).any():
+            raise ValueError("Budgets cannot be negative.")
+        self.recurring = recurring.astype({"Category": object, "Currency": object, "Frequency": object}).reset_index(drop=True)
+        # One budget per category; a later row replaces an earlier one
+        budgets = budgets.astype({"Category": object, "Currency": object})
+        budgets = budgets.assign(Key=budgets["Category"].map(fold))
+        self.budgets = budgets.drop_duplicates(subset="Key", keep="last").drop(columns="Key").reset_index(drop=True)
+
+        # Per-item arrays used by every projection
+        frequencies = [FREQUENCIES[name] for name in self.recurring["Frequency"]]
+        self._monthly = np.array([unit == "M" for unit, _ in frequencies], dtype=bool)
+        self._steps = np.array([step for _, step in frequencies], dtype=np.int64)
+        self._starts = self.recurring["Start"].to_numpy(dtype="datetime64[D]").view(np.int64)
+        ends = self.recurring["End"].to_numpy(dtype="datetime64[D]")
+        # Exclusive end day; open-ended items run past any window
+        self._ends = np.where(np.isnat(ends), np.iinfo(np.int32).max, ends.view(np.int64) + 1)
+        budget_keys = pd.Index(self.budgets["Category"].map(fold))
+        self._budget_keys = budget_keys
+        self._item_budgets = budget_keys.get_indexer(self.recurring["Category"].map(fold))
+        # Identifies the plan contents in cache keys
+        digest = hashlib.sha256()
+        for frame in (self.recurring, self.budgets):
+            digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        self.key = digest.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.recurring)
+
+    @classmethod
+    def load(cls, recurring_path=RECURRING_PATH, budgets_path=BUDGETS_PATH):
+        recurring = pd.read_csv(recurring_path) if os.path.exists(recurring_path) else None
+        budgets = pd.read_csv(budgets_path) if os.path.exists(budgets_path) else None
+        return cls(recurring, budgets)
+
+    def save(self, recurring_path=RECURRING_PATH, budgets_path=BUDGETS_PATH):
+        self.recurring.assign(Start=self.recurring["Start"].dt.strftime("%Y-%m-%d"),
+                              End=self.recurring["End"].dt.strftime("%Y-%m-%d")).to_csv(recurring_path, index=False)
+        self.budgets.to_csv(budgets_path, index=False)
+
+    def schedule(self, first, last, amounts):
+        """Spend per day and occurrence count per item on days ``first <= day < last``.
+
+        ``amounts`` holds each item's amount per occurrence. Returns an array of
+        ``last - first`` daily totals and an array of per-item counts.
+        """
+        lo = np.maximum(self._starts, first)
+        hi = np.minimum(self._ends, last)
+        length = last - first
+        spend = np.zeros(length)
+        counts = np.zeros(len(self.recurring), dtype=np.int64)
+
+        # Every ``step`` days from Start: ceil-divide the window edges into occurrence numbers, then
+        # mark each item's first occurrence and the one after its last in a difference array and
+        # run a cumulative sum down every ``step``-th day; one pass per distinct step, not per item
+        daily = np.flatnonzero(~self._monthly)
+        start, step = self._starts[daily], self._steps[daily]
+        k0 = -((start - lo[daily]) // step)
+        k1 = -((start - hi[daily]) // step)
+        counts[daily] = np.maximum(k1 - k0, 0)
+        for period in np.unique(step).tolist():
+            pick = (step == period) & (k1 > k0)
+            rows = -(-length // period) + 1
+            size = rows * period
+            diff = (np.bincount(start[pick] + k0[pick] * period - first, weights=amounts[daily[pick]], minlength=size)
+                    - np.bincount(start[pick] + k1[pick] * period - first, weights=amounts[daily[pick]], minlength=size))
+            spend += diff.reshape(rows, period).cumsum(axis=0).ravel()[:length]
+        # The running sums leave float residue where items stop; no amount has more than cents
+        spend = np.round(spend, 6)
+
+        # Every ``step`` months on Start's day of the month, clamped to the month's length; at most
+        # one occurrence per month, so these are laid out one by one (a cumulative sum of the
+        # per-item counts places them in one flat array) and only the first and last candidate
+        # month of an item can fall outside the window
+        monthly = np.flatnonzero(self._monthly)
+        start, step = self._starts[monthly], self._steps[monthly]
+        start_month = start.astype("datetime64[D]").astype("datetime64[M]").view(np.int64)
+        day_of_month = start - _month_days(start_month)
+        lo_month = lo[monthly].astype("datetime64[D]").astype("datetime64[M]").view(np.int64)
+        hi_month = (hi[monthly] - 1).astype("datetime64[D]").astype("datetime64[M]").view(np.int64)
+        j0 = -((start_month - lo_month) // step)
+        j1 = (hi_month - start_month) // step + 1
+        items, offsets = _expand(np.where(hi[monthly] > lo[monthly], np.maximum(j1 - j0, 0), 0))
+        months = start_month[items] + (j0[items] + offsets) * step[items]
+        month_first = _month_days(months)
+        days = month_first + np.minimum(day_of_month[items], _month_days(months + 1) - month_first - 1)
+        inside = (days >= lo[monthly][items]) & (days < hi[monthly][items])
+        items, days = monthly[items[inside]], days[inside]
+        spend += np.bincount(days - first, weights=amounts[items], minlength=length)
+        counts += np.bincount(items, minlength=len(counts))
+        return spend, counts
+
+    def _converted(self, amounts, currencies, rates, target, today):
+        # Forecasts use the rates in effect today for every future occurrence
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if (currencies == target).all():
+            return amounts
+        return rates.convert(amounts, currencies.to_numpy(), np.full(len(amounts), today), target)
+
+    def project(self, rates, target, balance=0.0, monthly_income=0.0, months=FORECAST_MONTHS, today=None,
+                spent=None):
+        """Project recurring spending over ``months`` calendar months, starting ``today``.
+
+        Amounts are converted into ``target`` at the rates in effect today.
+        Returns ``(daily, monthly, burn)``:
+
+        - ``daily``: projected spend per day, a Series indexed by Date like the
+          trend chart's per-day totals.
+        - ``monthly``: Month, Expenses, Income and Balance per month; the
+          balance starts from ``balance`` and ``monthly_income`` arrives at the
+          start of every month after the current one.
+        - ``burn``: per budgeted category, this month's Spent (``spent``, the
+          month's per-category sums in ``target``), Upcoming recurring
+          spend for the rest of the month, Projected (their sum), Budget, Used
+          (percent of the budget) and the average Recurring spend per month
+          over the window.
+        """
+        months = min(max(int(months), 1), MAX_FORECAST_MONTHS)
+        today = np.datetime64(today if today is not None else datetime.date.today(), "D")
+        first = int(today.astype(np.int64))
+        this_month = int(today.astype("datetime64[M]").astype(np.int64))
+        month_starts = _month_days(this_month + np.arange(months + 1))
+        last = int(month_starts[-1])
+
+        amounts = self._converted(self.recurring["Amount"], self.recurring["Currency"], rates, target, today)
+        spend, counts = self.schedule(first, last, amounts)
+        spent_days = np.flatnonzero(spend)
+        daily = pd.Series(spend[spent_days], index=pd.Index((first + spent_days).astype("datetime64[D]"), name="Date"),
+                          name="Amount")
+
+        expenses = np.add.reduceat(spend, np.maximum(month_starts[:-1] - first, 0))
+        income = np.full(months, float(monthly_income))
+        income[0] = 0.0
+        monthly = pd.DataFrame({
+            "Month": month_starts[:-1].astype("datetime64[D]"),
+            "Expenses": expenses,
+            "Income": income,
+            "Balance": balance + np.cumsum(income - expenses),
+        })
+
+        budget_count = len(self.budgets)
+        budgeted = self._item_budgets >= 0
+        _, this_month_counts = self.schedule(first, int(month_starts[1]), amounts)
+        upcoming = np.bincount(self._item_budgets[budgeted], weights=(amounts * this_month_counts)[budgeted],
+                               minlength=budget_count)
+        recurring = np.bincount(self._item_budgets[budgeted], weights=(amounts * counts)[budgeted],
+                                minlength=budget_count)
+        if spent is not None and len(spent):
+            positions = self._budget_keys.get_indexer([fold(name) for name in spent.index.tolist()])
+            known = positions >= 0
+            spent = np.bincount(positions[known], weights=spent.to_numpy(dtype=np.float64)[known], minlength=budget_count)
+        else:
+            spent = np.zeros(budget_count)
+        budget = self._converted(self.budgets["Budget"], self.budgets["Currency"], rates, target, today)
+        projected = spent + upcoming
+        used = np.divide(projected * 100, budget, out=np.where(projected > 0, np.inf, 0.0), where=budget > 0)
+        burn = pd.DataFrame({
+            "Category": self.budgets["Category"].to_numpy(),
+            "Spent": spent,
+            "Upcoming": upcoming,
+            "Projected": projected,
+            "Budget": budget,
+            "Used": used,
+            "Recurring": recurring / months,
+        })
+        return daily, monthly, burn
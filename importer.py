@@ -0,0 +1,216 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from currency import BASE_CURRENCY, base_rates, reporting_total
+from dedup import resolve_batch
+
+# Rows parsed and validated per chunk
+CHUNK_ROWS = 20_000
+
+STATEMENT_TYPES = ["csv", "xlsx", "ofx", "qfx"]
+
+# Lower-cased statement headers recognised for each ledger column
+COLUMN_ALIASES = {
+    "Category": ["category", "description", "payee", "name", "merchant", "memo"],
+    "Amount": ["amount", "debit", "value", "transaction amount"],
+    "Date": ["date", "transaction date", "posted date", "posting date", "booking date"],
+}
+
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def _normalize_columns(chunk):
+    headers = {str(column).strip().lower(): column for column in chunk.columns}
+    renamed = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        match = next((headers[alias] for alias in aliases if alias in headers), None)
+        if match is None:
+            raise ValueError(f"Statement has no {name} column (expected one of: {', '.join(aliases)}).")
+        renamed[match] = name
+    return chunk[list(renamed)].rename(columns=renamed)
+
+
+def _read_csv(statement, chunk_rows):
+    for chunk in pd.read_csv(statement, chunksize=chunk_rows, dtype=str, keep_default_na=False):
+        yield _normalize_columns(chunk)
+
+
+def _read_excel(statement, chunk_rows):
+    from openpyxl import load_workbook
+
+    # Read-only workbooks stream rows from disk instead of loading every cell
+    workbook = load_workbook(statement, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield _normalize_columns(pd.DataFrame(chunk, columns=header))
+            chunk = []
+    if chunk:
+        yield _normalize_columns(pd.DataFrame(chunk, columns=header))
+    workbook.close()
+
+
+def _read_ofx(statement, chunk_rows):
+    # OFX/QFX statements: debits become expenses, credits are skipped
+    text = statement.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", errors="replace")
+    transactions = _OFX_TRANSACTION.findall(text)
+    for start in range(0, len(transactions), chunk_rows):
+        fields = [dict((tag.upper(), value.strip()) for tag, value in _OFX_FIELD.findall(block))
+                  for block in transactions[start:start + chunk_rows]]
+        chunk = pd.DataFrame(fields, columns=["NAME", "MEMO", "TRNAMT", "DTPOSTED"])
+        amounts = pd.to_numeric(chunk["TRNAMT"], errors="coerce")
+        debits = (amounts < 0).to_numpy()
+        yield pd.DataFrame({
+            "Category": chunk["NAME"].where(chunk["NAME"].fillna("") != "", chunk["MEMO"])[debits],
+            "Amount": -amounts[debits],
+            "Date": chunk["DTPOSTED"].str[:8][debits],
+        })
+
+
+def read_statement(statement, file_name, chunk_rows=CHUNK_ROWS):
+    """Yield Category/Amount/Date chunks parsed from a CSV, Excel or OFX statement.
+
+    ``statement`` is a path or a binary file-like object (such as a Streamlit
+    upload); ``file_name`` picks the parser by extension.
+    """
+    extension = file_name.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return _read_csv(statement, chunk_rows)
+    if extension == "xlsx":
+        return _read_excel(statement, chunk_rows)
+    if extension in ("ofx", "qfx"):
+        return _read_ofx(statement, chunk_rows)
+    raise ValueError(f"Unsupported statement type: .{extension}")
+
+
+def _parse_dates(values):
+    # Fast path infers one format for the whole column; only leftovers are parsed one by one
+    dates = pd.to_datetime(values, errors="coerce")
+    retry = dates.isna() & values.notna() & (values.astype("string").str.strip() != "")
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return dates
+
+
+def validate_chunk(chunk):
+    """Split a chunk into typed valid rows and rejected rows with a Reason column.
+
+    Every check is a column-wise mask: amounts must parse and be non-negative,
+    a category is required and dates must parse.
+    """
+    categories = chunk["Category"].astype("string").str.strip()
+    amounts = pd.to_numeric(chunk["Amount"], errors="coerce")
+    dates = _parse_dates(chunk["Date"])
+
+    reasons = pd.Series(pd.NA, index=chunk.index, dtype="string")
+    reasons = reasons.mask(dates.isna(), "Invalid date")
+    reasons = reasons.mask(categories.isna() | (categories == ""), "Expense category is required.")
+    reasons = reasons.mask(amounts < 0, "Expense amount cannot be negative.")
+    reasons = reasons.mask(amounts.isna(), "Invalid amount")
+
+    valid = reasons.isna().to_numpy()
+    valid_rows = pd.DataFrame({
+        "Category": categories[valid].to_numpy(dtype=object),
+        "Amount": amounts[valid].to_numpy(dtype=np.float64),
+        "Date": dates[valid].dt.date.to_numpy(dtype=object),
+    })
+    rejected_rows = chunk[~valid].assign(Reason=reasons[~valid])
+    return valid_rows, rejected_rows
+
+
+def apply_balance_rule(ledger, rows, income, rates=None, incurrency=BASE_CURRENCY):
+    """Split ``rows`` into those that fit in the remaining balance and those that do not.
+
+    Mirrors the "Expense amount cannot exceed total balance" check main()
+    applies per expense: each row's effect on total expenses is its amount
+    minus the amount it overwrites (an earlier accepted row in the batch or
+    the ledger for the same Category and Date), both converted into
+    ``incurrency``. A row that would take total expenses past the income is
+    rejected and the rows after it are still checked.
+
+    Existing rows are found with one batch key lookup. While every row fits,
+    the check is a cumulative sum; from the first row that does not, rows
+    are checked one by one, since each rejection changes what follows.
+    """
+    rates = rates if rates is not None else base_rates()
+    existing = ledger.lookup_many(Category=rows["Category"], Date=rows["Date"])
+    found = existing >= 0
+    replaced = np.zeros(len(rows))
+    if found.any():
+        replaced[found] = rates.convert(ledger.take(existing[found], "Amount"),
+                                        ledger.take(existing[found], "Currency"), rows["Date"][found], incurrency)
+    amounts = rates.convert(rows["Amount"], rows["Currency"], rows["Date"], incurrency)
+    previous = rows.assign(Amount=amounts).groupby(["Category", "Date"], sort=False)["Amount"].shift(1).to_numpy()
+    effects = amounts - np.where(np.isnan(previous), replaced, previous)
+
+    total = reporting_total(ledger, rates, incurrency)
+    running = total + np.cumsum(effects)
+    over = np.flatnonzero(running > income)
+    if not over.size:
+        return rows, rows.iloc[:0]
+
+    # Rows up to the first one that overdraws all fit; from there, skip each row that does not
+    start = over[0]
+    accepted = np.zeros(len(rows), dtype=bool)
+    accepted[:start] = True
+    total = running[start - 1] if start else total
+    keys = list(zip(rows["Category"].tolist(), rows["Date"].tolist()))
+    current = dict(zip(keys[:start], amounts[:start].tolist()))
+    for position in range(start, len(rows)):
+        key = keys[position]
+        effect = amounts[position] - current.get(key, replaced[position])
+        if total + effect <= income:
+            total += effect
+            current[key] = amounts[position]
+            accepted[position] = True
+    return rows[accepted], rows[~accepted]
+
+
+def import_statement(ledger, statement, file_name, income, store=None, chunk_rows=CHUNK_ROWS,
+                     currency=BASE_CURRENCY, rates=None, incurrency=BASE_CURRENCY, policy="merge"):
+    """Validate a statement chunk by chunk and upsert it on (Category, Date).
+
+    Every imported expense is recorded in ``currency``; the balance check
+    converts amounts into the reporting currency ``incurrency``. Rows that
+    duplicate a recorded expense or an earlier row are handled per ``policy``
+    (see dedup.resolve_batch). Returns the number of imported rows, the
+    number of rows combined into a later row for the same Category and Date
+    ("merge" and "sum" policies), and a DataFrame of rejected rows with the
+    reason each one was rejected.
+    """
+    rates = rates if rates is not None else base_rates()
+    imported = 0
+    combined = 0
+    rejected = []
+    for chunk in read_statement(statement, file_name, chunk_rows):
+        rows, invalid = validate_chunk(chunk)
+        rows["Currency"] = currency
+        rejected.append(invalid)
+        rows, duplicates = resolve_batch(ledger, rows, policy, rates)
+        rejected.append(duplicates.assign(Reason="Duplicate expense."))
+        rows, over_balance = apply_balance_rule(ledger, rows, income, rates, incurrency)
+        rejected.append(over_balance.assign(Reason="Expense amount cannot exceed total balance."))
+
+        # Later rows for the same Category and Date overwrite earlier ones, as in main()
+        unique = rows.drop_duplicates(subset=["Category", "Date"], keep="last")
+        combined += len(rows) - len(unique)
+        rows = unique
+        imported += len(rows)
+        ledger.upsert_many(Category=rows["Category"].to_numpy(), Amount=rows["Amount"].to_numpy(),
+                           Currency=rows["Currency"].to_numpy(), Date=rows["Date"].to_numpy())
+        if store is not None:
+            store.upsert_many(rows["Category"].tolist(), rows["Amount"].tolist(), rows["Date"].tolist(),
+                              rows["Currency"].tolist())
+    rejected = [frame for frame in rejected if not frame.empty]
+    rejected = pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame(columns=["Reason"])
+    return imported, combined, rejected
@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Report and export builds from every session share one bounded pool
+JOB_WORKERS = int(os.environ.get("FINANCE_JOB_WORKERS", "2"))
+
+# Bytes of finished artifacts kept per session; the oldest are dropped first
+ARTIFACT_CACHE_BYTES = 256 * 1024 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="jobs")
+
+
+def _artifact_bytes(result):
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, tuple):
+        return sum(_artifact_bytes(part) for part in result)
+    return 0
+
+
+def job_status(future):
+    # "queued", "running", "done" or "failed"; None for no job
+    if future is None:
+        return None
+    if not future.done():
+        return "running" if future.running() else "queued"
+    return "failed" if future.exception() is not None else "done"
+
+
+class JobRunner:
+    """Background jobs of one session, deduplicated by key, with finished artifacts cached.
+
+    Keys combine the kind of output with the ledger's data version and every
+    other input (currency, income, format, ...), like FigureCache keys. A
+    submit while the same key is queued or running returns the job already in
+    flight, and one that finished returns its cached result, so repeat clicks
+    never start the work again. Failed jobs are retried on the next submit.
+
+    ``track()`` registers a Future made elsewhere (e.g. speech synthesis,
+    which has its own single-threaded worker) so the UI polls every kind of
+    job the same way.
+    """
+
+    def __init__(self, max_bytes=ARTIFACT_CACHE_BYTES, executor=_executor):
+        self.max_bytes = max_bytes
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        # Artifact size of every finished job still held, and their total
+        self._sizes = {}
+        self._bytes = 0
+
+    def submit(self, key, function, *args, **kwargs):
+        with self._lock:
+            future = self._jobs.get(key)
+            added = future is None or (future.done() and future.exception() is not None)
+            if added:
+                future = self._executor.submit(function, *args, **kwargs)
+                self._add(key, future)
+            else:
+                self._jobs.move_to_end(key)
+        if added:
+            self._watch(key, future)
+        return future
+
+    def track(self, key, future):
+        with self._lock:
+            added = self._jobs.get(key) is not future
+            if added:
+                self._add(key, future)
+        if added:
+            self._watch(key, future)
+        return future
+
+    def _add(self, key, future):
+        self._bytes -= self._sizes.pop(key, 0)
+        self._jobs[key] = future
+        self._jobs.move_to_end(key)
+
+    def _watch(self, key, future):
+        # Outside the lock: on a future that is already done the callback runs right here
+        future.add_done_callback(lambda _: self._finished(key, future))
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self._jobs.get(key) is not future:
+                return
+            self._sizes[key] = _artifact_bytes(future.result()) if future.exception() is None else 0
+            self._bytes += self._sizes[key]
+            # Drop the least recently used finished artifacts beyond max_bytes; jobs in flight stay
+            evicted = []
+            for old_key in self._jobs:
+                if self._bytes <= self.max_bytes:
+                    break
+                if old_key in self._sizes:
+                    self._bytes -= self._sizes.pop(old_key)
+                    evicted.append(old_key)
+            for old_key in evicted:
+                del self._jobs[old_key]
+
+    def get(self, key):
+        # The job's Future, or None for a job never submitted (or evicted)
+        with self._lock:
+            return self._jobs.get(key)
@@ -0,0 +1,269 @@
+import collections
+import contextlib
+import datetime
+import json
+import os
+import threading
+
+# Changes journaled between snapshots, and how many user actions undo can step back through
+SNAPSHOT_EVERY = 1000
+UNDO_DEPTH = 100
+
+# One lock per journal path: the sessions of a Streamlit server are threads of one process sharing the file
+_PATH_LOCKS = collections.defaultdict(threading.Lock)
+_PATH_LOCKS_GUARD = threading.Lock()
+
+
+def _path_lock(path):
+    with _PATH_LOCKS_GUARD:
+        return _PATH_LOCKS[os.path.abspath(path)]
+
+
+def _to_json(row):
+    if row is None:
+        return None
+    return {name: value.isoformat() if isinstance(value, datetime.date) else value for name, value in row.items()}
+
+
+def _from_json(row):
+    if row is None:
+        return None
+    if row.get("Date"):
+        row = dict(row, Date=datetime.date.fromisoformat(row["Date"]))
+    return row
+
+
+def apply_change(ledger, before, after):
+    # Replay one change on a keyed ledger: drop the ``before`` row unless ``after`` reuses its key, then upsert ``after``
+    if before is not None and (after is None or any(before[name] != after[name] for name in ledger.key)):
+        row = ledger.lookup(**before)
+        if row is not None:
+            ledger.delete(row)
+    if after is not None:
+        ledger.upsert(**after)
+
+
+class ExpenseJournal:
+    """Append-only journal of ledger changes, with Arrow snapshots and undo/redo.
+
+    Attached to a keyed ExpenseLedger through ``on_change``, every add, update
+    and delete is appended to ``path`` as one JSON line holding the row before
+    and after the change. Every ``snapshot_every`` changes the whole ledger is
+    written to ``<path>.snapshot.arrow`` (Arrow IPC, uncompressed so it can be
+    memory-mapped) and the journal it covers is truncated, so a restore maps
+    the snapshot and replays only the journal tail behind it.
+
+    Sessions share the journal: appends, snapshots and restores of one path
+    are serialized by a lock, and a snapshot taken after other sessions
+    appended is built from the snapshot and journal on disk rather than from
+    this session's ledger, so their changes are kept. The database stays the
+    source of truth: a restore that does not add up to its ``totals()``
+    reseeds from it.
+
+    Each mutation is one undo step, however many rows it touched, and so is
+    everything inside a ``batch()`` block (a statement import upserted chunk
+    by chunk). Undo applies the inverse changes to the ledger
+    and journals them like any other change, so replay reproduces the state
+    after an undo; nothing is copied beyond the changed rows themselves.
+    """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY, undo_depth=UNDO_DEPTH):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot.arrow"
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self._since_snapshot = 0
+        self._undo = collections.deque(maxlen=undo_depth)
+        self._redo = []
+        # Changes of the batch() block in progress, journaled as they come and undone as one step
+        self._batch = None
+        self._file = None
+        self._ledger = None
+        self._lock = _path_lock(path)
+        # Journal size after this session's last write; any other size means another session wrote
+        self._end = 0
+        # Whether this session's ledger is the state the snapshot and journal on disk add up to
+        self._own_state = False
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def restore(self, ledger, seed=None, totals=None):
+        """Fill an empty ledger from the latest snapshot and the journal tail, then start journaling its changes.
+
+        Without a journal on disk, ``seed(ledger)`` (e.g. ``ExpenseStore.load``)
+        fills the ledger instead and the result becomes the first snapshot.
+        ``totals()`` (e.g. ``ExpenseStore.totals``) returns the row count and
+        amount in cents the restored ledger must match; when it does not, the
+        journal has drifted from the database and the ledger is reseeded.
+        """
+        with self._lock:
+            offset = 0
+            if os.path.exists(self.snapshot_path):
+                offset = self._load_snapshot(ledger)
+            elif not os.path.exists(self.path) and seed is not None:
+                seed(ledger)
+            replayed = self._replay(ledger, offset)
+            drifted = totals is not None and seed is not None and totals() != (len(ledger), ledger.aggregates.total_cents)
+            if drifted:
+                ledger.delete(ledger.find())
+                seed(ledger)
+            self._file = open(self.path, "ab")
+            self._end = os.fstat(self._file.fileno()).st_size
+            self._own_state = True
+            self._ledger = ledger
+            ledger.on_change = self.record
+            if drifted or not os.path.exists(self.snapshot_path) or replayed >= self.snapshot_every:
+                self._snapshot(own=drifted or None)
+        return ledger
+
+    def _load_snapshot(self, ledger):
+        # Fill ``ledger`` from the snapshot; returns the journal offset it covers (0 since snapshots truncate the journal)
+        import pyarrow as pa
+
+        with pa.memory_map(self.snapshot_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata
+        self.seq = int(metadata[b"seq"])
+        ledger.extend(**{name: table.column(name).to_numpy(zero_copy_only=False) for name in ledger.columns})
+        return int(metadata[b"offset"])
+
+    def _replay(self, ledger, offset):
+        # Apply the journal from byte ``offset`` on; returns how many changes it held
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, "r+b") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A write cut short by a crash; drop it so new changes start on a clean line
+                    f.truncate(offset)
+                    break
+                event = json.loads(line)
+                apply_change(ledger, _from_json(event["before"]), _from_json(event["after"]))
+                self.seq = event["seq"]
+                offset += len(line)
+                count += 1
+        self._since_snapshot = count
+        return count
+
+    def _append(self, changes):
+        lines = []
+        for before, after in changes:
+            self.seq += 1
+            event = {"seq": self.seq, "before": _to_json(before), "after": _to_json(after)}
+            lines.append(json.dumps(event).encode("utf-8") + b"\n")
+        with self._lock:
+            if os.fstat(self._file.fileno()).st_size != self._end:
+                self._own_state = False
+            self._file.writelines(lines)
+            self._file.flush()
+            self._end = os.fstat(self._file.fileno()).st_size
+            self._since_snapshot += len(changes)
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot()
+
+    def record(self, changes):
+        # Ledger on_change hook: journal a mutation as one undo step
+        if not changes:
+            return
+        self._append(changes)
+        if self._batch is not None:
+            self._batch.extend(changes)
+            return
+        self._undo.append(changes)
+        self._redo.clear()
+
+    @contextlib.contextmanager
+    def batch(self):
+        # Make every mutation inside the block one undo step, e.g. a statement imported chunk by chunk
+        self._batch = []
+        try:
+            yield
+        finally:
+            changes, self._batch = self._batch, None
+            if changes:
+                self._undo.append(changes)
+                self._redo.clear()
+
+    def _apply(self, changes):
+        # Change the ledger without journaling through on_change; the caller journals the result
+        ledger = self._ledger
+        ledger.on_change = None
+        try:
+            for before, after in changes:
+                apply_change(ledger, before, after)
+        finally:
+            ledger.on_change = self.record
+        self._append(changes)
+
+    def undo(self):
+        # Revert the latest mutation; returns the (before, after) changes applied, or [] if there is nothing to undo
+        if not self._undo:
+            return []
+        changes = self._undo.pop()
+        inverse = [(after, before) for before, after in reversed(changes)]
+        self._apply(inverse)
+        self._redo.append(changes)
+        return inverse
+
+    def redo(self):
+        if not self._redo:
+            return []
+        changes = self._redo.pop()
+        self._apply(changes)
+        self._undo.append(changes)
+        return changes
+
+    def snapshot(self):
+        # Write the state the snapshot and journal on disk add up to, replacing the snapshot and emptying the journal
+        with self._lock:
+            self._snapshot()
+
+    def _snapshot(self, own=None):
+        import pyarrow as pa
+
+        self._file.flush()
+        if own is None:
+            own = self._own_state and os.fstat(self._file.fileno()).st_size == self._end
+        if own:
+            frame = self._ledger.to_frame()
+        else:
+            frame = self._disk_state().to_frame()
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, seq=str(self.seq), offset="0"))
+        temporary = f"{self.snapshot_path}.tmp"
+        with pa.OSFile(temporary, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary, self.snapshot_path)
+        # A crash before the truncate only leaves changes the snapshot already holds; replaying them is idempotent
+        os.ftruncate(self._file.fileno(), 0)
+        self._end = 0
+        self._own_state = own
+        self._since_snapshot = 0
+
+    def _disk_state(self):
+        # A fresh ledger holding the snapshot plus the whole journal, as a restore in a new session would see it
+        from ledger import ExpenseLedger
+
+        ledger = ExpenseLedger(columns=self._ledger.columns, key=self._ledger.key)
+        seq = self.seq
+        offset = self._load_snapshot(ledger) if os.path.exists(self.snapshot_path) else 0
+        self._replay(ledger, offset)
+        self.seq = seq
+        return ledger
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._ledger is not None:
+            self._ledger.on_change = None
+            self._ledger = None
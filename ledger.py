@@ -0,0 +1,527 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# How each column the apps know about is held in memory:
+#   "category" - small-integer codes into a per-ledger dictionary of values
+#   "cents"    - int64 hundredths, exact for money
+#   "date"     - int64 days since the epoch, read back as datetime64[D] (NaT when missing)
+COLUMN_TYPES = {
+    "Category": "category",
+    "Amount": "cents",
+    "Currency": "category",
+    "Date": "date",
+}
+
+# Storage dtype for every column
+COLUMN_DTYPES = {
+    "Category": np.int32,
+    "Amount": np.int64,
+    "Currency": np.int16,
+    "Date": np.int64,
+}
+
+NAT_DAYS = np.iinfo(np.int64).min
+
+# Day numbers are offset into the low 32 bits of a packed (code, day) key; NaT packs as 0 there
+DAY_OFFSET = 2**31
+
+# Key index inserts buffered before they are merged into its sorted arrays: at least INDEX_MERGE_EVERY,
+# and one per INDEX_MERGE_FRACTION of the keys held, as in ranges.py
+INDEX_MERGE_EVERY = 1024
+INDEX_MERGE_FRACTION = 64
+
+
+def pack_keys(codes, days):
+    # One int64 per (code, day number) pair, ordered by code and then day
+    days = np.asarray(days, dtype=np.int64)
+    days = np.where(days == NAT_DAYS, -DAY_OFFSET, days)
+    return (np.asarray(codes, dtype=np.int64) << 32) + (days + DAY_OFFSET)
+
+
+def pack_key(code, day):
+    # pack_keys() for one pair of Python ints
+    if day == NAT_DAYS:
+        day = -DAY_OFFSET
+    return (code << 32) + day + DAY_OFFSET
+
+
+def to_cents(amounts):
+    return np.round(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+
+
+def to_days(dates):
+    # Days since the epoch for dates, datetimes, strings or None (NaT)
+    values = np.asarray(dates)
+    if values.dtype.kind != "M":
+        # Parse each distinct value once; ledgers repeat the same dates many times
+        codes, uniques = pd.factorize(np.asarray(dates, dtype=object), use_na_sentinel=False)
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object)).to_numpy(dtype="datetime64[D]")
+        values = parsed[codes]
+    return values.astype("datetime64[D]").view(np.int64)
+
+
+class KeyIndex:
+    """Map from packed int64 keys (see ``pack_keys``) to ledger rows.
+
+    Keys and rows are two parallel arrays sorted by key, so a lookup is a
+    binary search and a batch lookup one ``searchsorted``, at 16 bytes per
+    row. Single inserts go to a small dict that lookups check first; once it
+    holds a fixed fraction of the index it is merged into the arrays in one
+    linear pass, as ExpenseRanges does. A removed key keeps its slot with
+    row -1 until the next merge drops it.
+    """
+
+    def __init__(self):
+        self._keys = np.empty(0, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._removed = 0
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._keys) - self._removed + len(self._pending)
+
+    @property
+    def nbytes(self):
+        return (self._keys.nbytes + self._rows.nbytes + sys.getsizeof(self._pending)
+                + sum(sys.getsizeof(key) + sys.getsizeof(row) for key, row in self._pending.items()))
+
+    def _position(self, key):
+        # Position of ``key`` in the sorted arrays, or None
+        position = int(np.searchsorted(self._keys, key))
+        if position < len(self._keys) and self._keys[position] == key:
+            return position
+        return None
+
+    def get(self, key):
+        row = self._pending.get(key)
+        if row is None:
+            position = self._position(key)
+            if position is not None and self._rows[position] >= 0:
+                row = int(self._rows[position])
+        return row
+
+    def get_many(self, keys):
+        # Row of each key, -1 where there is none
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = _sorted_lookup(self._keys, self._rows, keys)
+        if self._pending:
+            pending_keys = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            pending_rows = np.fromiter(self._pending.values(), dtype=np.int64, count=len(self._pending))
+            order = np.argsort(pending_keys)
+            missing = rows < 0
+            rows[missing] = _sorted_lookup(pending_keys[order], pending_rows[order], keys[missing])
+        return rows
+
+    def add(self, key, row):
+        self._pending[key] = row
+        if len(self._pending) >= max(INDEX_MERGE_EVERY, len(self._keys) // INDEX_MERGE_FRACTION):
+            self._merge()
+
+    def add_many(self, keys, rows):
+        # Keys must be new to the index and distinct
+        self._merge(np.asarray(keys, dtype=np.int64), np.asarray(rows, dtype=np.int64))
+
+    def remove(self, key):
+        if self._pending.pop(key, None) is None:
+            self._rows[self._position(key)] = -1
+            self._removed += 1
+
+    def _merge(self, keys=None, rows=None):
+        # Merge the pending dict, plus an optional batch, into the sorted arrays, dropping removed keys
+        count = len(self._pending)
+        new_keys = np.fromiter(self._pending, dtype=np.int64, count=count)
+        new_rows = np.fromiter(self._pending.values(), dtype=np.int64, count=count)
+        self._pending = {}
+        if keys is not None:
+            new_keys, new_rows = np.concatenate((new_keys, keys)), np.concatenate((new_rows, rows))
+        if self._removed:
+            kept = self._rows >= 0
+            self._keys, self._rows = self._keys[kept], self._rows[kept]
+            self._removed = 0
+        order = np.argsort(new_keys)
+        new_keys, new_rows = new_keys[order], new_rows[order]
+        positions = np.searchsorted(self._keys, new_keys)
+        self._keys = np.insert(self._keys, positions, new_keys)
+        self._rows = np.insert(self._rows, positions, new_rows)
+
+
+def _sorted_lookup(sorted_keys, rows, keys):
+    # Row of each key in a sorted key array, -1 where it is absent
+    if len(sorted_keys) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[positions] == keys, rows[positions], -1)
+
+
+class ExpenseLedger:
+    """Append-only, column-oriented expense buffer with a typed schema.
+
+    Each column is a NumPy array with spare capacity that doubles when full, so
+    adding an expense is amortized O(1) instead of copying the whole DataFrame
+    with ``pd.concat``. A DataFrame is only materialized when a view asks for
+    one, and it is cached until the ledger changes again.
+
+    Values are converted to their storage type (COLUMN_TYPES) at every insert
+    and update: categories and currencies become codes into a dictionary,
+    amounts integer cents and dates day numbers. Reads convert back, and
+    frames come out with categorical Category/Currency, float Amount and
+    datetime64 Date columns.
+
+    When ``key`` names a column, or a category column and one more, a
+    KeyIndex maps each key, packed into one int64, to its row so upserts,
+    updates and deletes by key never scan the columns. Deleted rows are
+    tombstoned and compacted once they make up half of the buffer.
+
+    ``aggregates`` is kept in step with every mutation, giving the total and
+    per-category / per-date / per-currency sums without a groupby over the ledger.
+    A ledger keyed on Category, or on Category and Date, also has
+    ``fingerprints`` (FingerprintIndex), which finds duplicates through the
+    key index.
+
+    When ``on_change`` is set, every mutation calls it once with a list of
+    ``(before, after)`` row dicts (see ``records()``); ``before`` is None for
+    an added row and ``after`` None for a deleted one.
+    """
+
+    def __init__(self, columns=("Category", "Amount", "Date"), key=None, capacity=64):
+        self.columns = tuple(columns)
+        self.key = tuple(key) if key else None
+        if self.key is not None and (len(self.key) > 2 or len(self.key) == 2 and COLUMN_TYPES[self.key[0]] != "category"):
+            raise ValueError("A ledger key is one column, or a category column and one more.")
+        self.version = 0
+        self._size = 0
+        self._deleted = 0
+        self._capacity = max(int(capacity), 1)
+        self._data = {name: np.empty(self._capacity, dtype=COLUMN_DTYPES[name]) for name in self.columns}
+        self._alive = np.ones(self._capacity, dtype=bool)
+        self._index = KeyIndex()
+        self._frames = {}
+        # Per-column dictionaries of category values and their codes
+        self._values = {name: [] for name in self.columns if COLUMN_TYPES[name] == "category"}
+        self._codes = {name: {} for name in self._values}
+        # The aggregates and the fingerprint index pack their keys with this module's helpers, so they are imported here
+        from aggregates import ExpenseAggregates
+        from dedup import FingerprintIndex
+
+        dimensions = [name for name in ("Category", "Date", "Currency") if name in self.columns]
+        self.aggregates = ExpenseAggregates(dimensions, decoders={name: self._decode for name in dimensions})
+        self.fingerprints = (FingerprintIndex(self, dated=len(self.key) == 2)
+                             if self.key in (("Category",), ("Category", "Date")) else None)
+        self.on_change = None
+
+    def __len__(self):
+        return self._size - self._deleted
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def _reserve(self, needed):
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, values in self._data.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._data[name] = grown
+        alive = np.ones(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+        self._capacity = capacity
+
+    def _touch(self):
+        self.version += 1
+        self._frames.clear()
+
+    def _code(self, name, value, add=True):
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None and add:
+            code = codes[value] = len(self._values[name])
+            self._values[name].append(value)
+        return code
+
+    def _encode_one(self, name, value, add=True):
+        # Storage value for one input value; None for a category never stored when ``add`` is False
+        kind = COLUMN_TYPES[name]
+        if kind == "category":
+            return self._code(name, value, add)
+        if kind == "cents":
+            return int(round(float(value) * 100))
+        if value is None or pd.isna(value):
+            return int(NAT_DAYS)
+        return int(np.datetime64(value, "D").astype(np.int64))
+
+    def _encode(self, name, values, add=True):
+        # Storage values for an array of input values; -1 for categories never stored when ``add`` is False
+        kind = COLUMN_TYPES[name]
+        if kind == "category":
+            inverse, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+            codes = [self._code(name, value, add) for value in uniques]
+            codes = np.array([-1 if code is None else code for code in codes], dtype=COLUMN_DTYPES[name])
+            return codes[inverse]
+        if kind == "cents":
+            return to_cents(values)
+        return to_days(values)
+
+    def _decode(self, name, stored):
+        # Stored values of ``name`` (or of a date rollup) back to their Python-facing form
+        stored = np.asarray(stored)
+        kind = COLUMN_TYPES.get(name, "date")
+        if kind == "category":
+            values = self._values[name]
+            stored = stored.astype(np.int64)
+            if stored.size * 16 < len(values):
+                # A few codes (duplicate checks on single entries) are picked without converting every name
+                return np.array([values[code] for code in stored.ravel().tolist()], dtype=object).reshape(stored.shape)
+            return np.asarray(values, dtype=object)[stored]
+        if kind == "cents":
+            return stored / 100
+        return stored.astype(np.int64).view("datetime64[D]")
+
+    def _pack(self, parts):
+        # Packed index key of one key's storage values; None when a category was never stored
+        if None in parts:
+            return None
+        return pack_key(*parts) if len(parts) == 2 else pack_key(0, parts[0])
+
+    def _pack_many(self, columns):
+        # Packed index keys of arrays of key storage values
+        return pack_keys(*columns) if len(columns) == 2 else pack_keys(0, columns[0])
+
+    def _key_of(self, row):
+        return self._pack([int(self._data[name][row]) for name in self.key])
+
+    def _encoded_key(self, values, add=False):
+        return self._pack([self._encode_one(name, values[name], add) for name in self.key])
+
+    def _aggregate(self, row, sign):
+        keys = {name: int(self._data[name][row]) for name in self.aggregates.dimensions}
+        if sign > 0:
+            self.aggregates.add(int(self._data["Amount"][row]), **keys)
+        else:
+            self.aggregates.remove(int(self._data["Amount"][row]), **keys)
+
+    def _live(self, name):
+        values = self._data[name][:self._size]
+        if self._deleted:
+            return values[self._alive[:self._size]]
+        return values
+
+    def dictionary(self, name):
+        # Values of a category column in code order; the ledger's own list, not to be modified
+        return self._values[name]
+
+    def column(self, name):
+        # Read-only copy of the live part of a column, decoded (strings, float amounts, datetime64 dates)
+        values = self._decode(name, self._live(name))
+        values.flags.writeable = False
+        return values
+
+    def records(self, rows):
+        # Rows as dicts of Python values (str, float, datetime.date or None)
+        rows = np.atleast_1d(rows)
+        columns = [self._decode(name, self._data[name][rows]).tolist() for name in self.columns]
+        return [dict(zip(self.columns, values)) for values in zip(*columns)]
+
+    def _changed(self, befores, rows):
+        self.on_change(list(zip(befores, self.records(rows))))
+
+    def lookup(self, **values):
+        # Row holding the given key, or None
+        key = self._encoded_key(values)
+        return None if key is None else self._index.get(key)
+
+    def lookup_many(self, **columns):
+        # Row holding each key of a batch of key columns, -1 where there is none
+        # (a category never stored encodes as -1, which packs to a key no row has)
+        return self._index.get_many(self._pack_many([self._encode(name, columns[name], add=False) for name in self.key]))
+
+    def take(self, rows, name):
+        # Decoded values of column ``name`` at an array of row positions
+        return self._decode(name, self._data[name][np.asarray(rows, dtype=np.int64)])
+
+    def append(self, **values):
+        if self.key is not None:
+            key = self._encoded_key(values, add=True)
+            if self._index.get(key) is not None:
+                raise ValueError(f"Duplicate ledger key: {tuple(values[name] for name in self.key)}")
+        encoded = {name: self._encode_one(name, values[name]) for name in self.columns}
+        self._reserve(self._size + 1)
+        row = self._size
+        for name in self.columns:
+            self._data[name][row] = encoded[name]
+        self._alive[row] = True
+        if self.key is not None:
+            self._index.add(key, row)
+        self._aggregate(row, +1)
+        self._size += 1
+        self._touch()
+        if self.on_change is not None:
+            self._changed([None], row)
+        return row
+
+    def upsert(self, **values):
+        # Overwrite the row with the same key, or append a new one
+        row = self.lookup(**values)
+        if row is None:
+            return self.append(**values)
+        encoded = {name: self._encode_one(name, values[name]) for name in self.columns if name not in self.key}
+        before = self.records(row) if self.on_change is not None else None
+        self._aggregate(row, -1)
+        for name, value in encoded.items():
+            self._data[name][row] = value
+        self._aggregate(row, +1)
+        self._touch()
+        if before is not None:
+            self._changed(before, row)
+        return row
+
+    def upsert_many(self, **columns):
+        # Bulk upsert of a batch with unique keys: overwrite existing rows, append the rest in one extend
+        encoded = {name: self._encode(name, columns[name]) for name in self.columns}
+        rows = self._index.get_many(self._pack_many([encoded[name] for name in self.key]))
+        new = rows < 0
+        updated = rows[~new]
+        before = self.records(updated) if self.on_change is not None and updated.size else []
+        for position in np.flatnonzero(~new):
+            row = int(rows[position])
+            self._aggregate(row, -1)
+            for name in self.columns:
+                if name not in self.key:
+                    self._data[name][row] = encoded[name][position]
+            self._aggregate(row, +1)
+        if (~new).any():
+            self._touch()
+        start = self._size
+        self._extend_encoded({name: values[new] for name, values in encoded.items()})
+        if self.on_change is not None:
+            self._changed(list(before) + [None] * (self._size - start),
+                          np.concatenate([updated, np.arange(start, self._size)]))
+        return int(new.sum())
+
+    def extend(self, **columns):
+        lengths = {len(columns[name]) for name in self.columns}
+        if len(lengths) != 1:
+            raise ValueError("All columns must have the same length.")
+        start = self._size
+        self._extend_encoded({name: self._encode(name, columns[name]) for name in self.columns})
+        if self.on_change is not None and self._size > start:
+            self._changed([None] * (self._size - start), np.arange(start, self._size))
+
+    def _extend_encoded(self, encoded):
+        count = len(encoded[self.columns[0]])
+        if count == 0:
+            return
+        start = self._size
+        if self.key is not None:
+            keys = self._pack_many([encoded[name] for name in self.key])
+            if len(np.unique(keys)) != count or (self._index.get_many(keys) >= 0).any():
+                raise ValueError("Duplicate ledger keys in batch.")
+        self._reserve(start + count)
+        for name in self.columns:
+            self._data[name][start:start + count] = encoded[name]
+        self._alive[start:start + count] = True
+        if self.key is not None:
+            self._index.add_many(keys, np.arange(start, start + count))
+        self.aggregates.add_many(
+            self._data["Amount"][start:start + count],
+            **{name: self._data[name][start:start + count] for name in self.aggregates.dimensions})
+        self._size += count
+        self._touch()
+
+    def find(self, **criteria):
+        # Row positions where every given column equals the given value
+        mask = self._alive[:self._size].copy()
+        for name, value in criteria.items():
+            code = self._encode_one(name, value, add=False)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self._data[name][:self._size] == code
+        return np.flatnonzero(mask)
+
+    def get(self, row, name):
+        value = self._decode(name, self._data[name][row:row + 1])[0]
+        if COLUMN_TYPES[name] == "date":
+            return None if np.isnat(value) else value.astype(object)
+        return float(value) if COLUMN_TYPES[name] == "cents" else value
+
+    def set(self, rows, name, value):
+        rows = np.atleast_1d(rows)
+        rekey = self.key is not None and name in self.key
+        code = self._encode_one(name, value)
+        before = self.records(rows) if self.on_change is not None else None
+        for row in rows:
+            self._aggregate(row, -1)
+            if rekey:
+                self._index.remove(self._key_of(row))
+        self._data[name][rows] = code
+        for row in rows:
+            self._aggregate(row, +1)
+            if rekey:
+                self._index.add(self._key_of(row), int(row))
+        self._touch()
+        if before is not None:
+            self._changed(before, rows)
+
+    def delete(self, rows):
+        rows = np.atleast_1d(rows)
+        rows = rows[self._alive[rows]]
+        if rows.size == 0:
+            return
+        if self.on_change is not None:
+            self.on_change([(before, None) for before in self.records(rows)])
+        for row in rows:
+            self._aggregate(row, -1)
+            if self.key is not None:
+                self._index.remove(self._key_of(row))
+        self._alive[rows] = False
+        self._deleted += rows.size
+        if self._deleted * 2 >= self._size:
+            self._compact()
+        self._touch()
+
+    def _compact(self):
+        keep = self._alive[:self._size]
+        remaining = int(keep.sum())
+        for values in self._data.values():
+            values[:remaining] = values[:self._size][keep]
+            values[remaining:self._size] = 0
+        self._alive[:self._size] = True
+        self._size = remaining
+        self._deleted = 0
+        if self.key is not None:
+            self._index = KeyIndex()
+            self._index.add_many(self._pack_many([self._data[name][:remaining] for name in self.key]), np.arange(remaining))
+
+    def to_frame(self, sort_by=None):
+        frame = self._frames.get(sort_by)
+        if frame is None:
+            columns = {}
+            for name in self.columns:
+                values = self._live(name)
+                if COLUMN_TYPES[name] == "category":
+                    columns[name] = pd.Categorical.from_codes(values, categories=pd.Index(self._values[name], dtype=object))
+                else:
+                    columns[name] = self._decode(name, values)
+            frame = pd.DataFrame(columns)
+            if sort_by is not None:
+                frame = frame.sort_values(by=sort_by, kind="stable", ignore_index=True)
+            self._frames[sort_by] = frame
+        return frame
+
+    def memory_usage(self):
+        """Bytes held per part of the ledger: each column, the dictionaries, the key index and the aggregates."""
+        usage = {name: values.nbytes for name, values in self._data.items()}
+        usage["alive"] = self._alive.nbytes
+        usage["dictionaries"] = sum(sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+                                    + sys.getsizeof(self._codes[name]) for name, values in self._values.items())
+        usage["index"] = self._index.nbytes
+        usage.update(self.aggregates.memory_usage())
+        if self.fingerprints is not None:
+            usage["fingerprints"] = self.fingerprints.nbytes
+        return usage
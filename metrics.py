@@ -0,0 +1,135 @@
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Set FINANCE_METRICS_PATH to record stage timings: a ".prom" file gets the Prometheus text
+# format (rewritten after every rerun), any other path gets one JSON line per timed call
+METRICS_PATH = os.environ.get("FINANCE_METRICS_PATH", "")
+
+# Durations kept per stage for the rolling percentiles
+WINDOW = 1000
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Metrics:
+    """Stage timers with rolling p50/p95 and a local file export.
+
+    ``span(name, rows)`` times a block and ``timed()`` wraps a function (its
+    row count is the length of the first argument when it has one). Each
+    stage keeps its last ``window`` durations for the percentiles plus a
+    running count and sum; ``flush()`` writes what was recorded since the
+    previous flush to ``path``.
+
+    Without a path the recorder is off: ``timed()`` returns the function
+    unchanged and ``span()`` a shared no-op context, so instrumented code
+    pays next to nothing.
+    """
+
+    def __init__(self, path=METRICS_PATH, window=WINDOW):
+        self.path = path
+        self.enabled = bool(path)
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._counts = collections.Counter()
+        self._sums = collections.defaultdict(float)
+        self._rows = {}
+        self._pending = []
+
+    def record(self, name, seconds, rows=None):
+        with self._lock:
+            self._durations[name].append(seconds)
+            self._counts[name] += 1
+            self._sums[name] += seconds
+            if rows is not None:
+                self._rows[name] = rows
+            self._pending.append({"time": time.time(), "stage": name, "seconds": seconds, "rows": rows})
+
+    def span(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, rows)
+
+    @contextlib.contextmanager
+    def _span(self, name, rows):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, rows)
+
+    def timed(self, name=None):
+        def decorate(function):
+            if not self.enabled:
+                return function
+            stage = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                rows = len(args[0]) if args and hasattr(args[0], "__len__") else None
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start, rows)
+            return wrapper
+        return decorate
+
+    def summary(self):
+        # Per stage: calls, rolling p50/p95 seconds and the last row count
+        with self._lock:
+            durations = {name: np.fromiter(values, dtype=np.float64) for name, values in self._durations.items()}
+            counts, sums, rows = dict(self._counts), dict(self._sums), dict(self._rows)
+        return {
+            name: {
+                "count": counts[name],
+                "sum": sums[name],
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "rows": rows.get(name),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+    def flush(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if self.path.endswith(".prom"):
+            self._write_prometheus()
+        elif pending:
+            with open(self.path, "a") as f:
+                f.writelines(json.dumps(record) + "\n" for record in pending)
+
+    def _write_prometheus(self):
+        lines = [
+            f"# HELP finance_stage_seconds Duration of app stages; quantiles over the last {self.window} calls.",
+            "# TYPE finance_stage_seconds summary",
+        ]
+        summary = self.summary()
+        for name, stats in summary.items():
+            lines.append(f'finance_stage_seconds{{stage="{name}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'finance_stage_seconds{{stage="{name}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'finance_stage_seconds_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'finance_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += ["# HELP finance_stage_rows Rows handled by the last call of each stage.",
+                  "# TYPE finance_stage_rows gauge"]
+        lines += [f'finance_stage_rows{{stage="{name}"}} {stats["rows"]}'
+                  for name, stats in summary.items() if stats["rows"] is not None]
+        # Replace the file in one step so a scraper never reads half of it
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary, self.path)
+
+
+# Shared by both apps; module state outlives Streamlit reruns, so percentiles cover many reruns
+metrics = Metrics()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Report detail levels offered in the apps
+REPORT_DETAILS = {
+    "All expenses": "rows",
+    "By category": "category",
+    "By month": "month",
+}
+
+# Rows per LongTable chunk; ReportLab lays out each chunk independently, so
+# splitting keeps layout cost linear instead of re-measuring one huge table
+TABLE_CHUNK_ROWS = 500
+
+EXPENSE_TABLE_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), "grey"),
+    ("TEXTCOLOR", (0, 0), (-1, 0), (1, 1, 1)),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+    ("BACKGROUND", (0, 1), (-1, -1), (0.95, 0.95, 0.95)),
+    ("GRID", (0, 0), (-1, -1), 1, (0.75, 0.75, 0.75)),
+]
+
+
+def format_amounts(amounts, incurrency):
+    return np.char.add(incurrency, np.char.mod("%.2f", np.asarray(amounts, dtype=np.float64)))
+
+
+def format_dates(dates):
+    return pd.to_datetime(pd.Series(dates)).dt.strftime("%Y-%m-%d").to_numpy(dtype=str)
+
+
+def expense_table_rows(expense_df, incurrency, detail="rows"):
+    """Header and body rows for the expense table, formatted column-wise.
+
+    ``detail`` is ``"rows"`` to list every expense, or ``"category"`` /
+    ``"month"`` to list one summed row per category or calendar month.
+    """
+    if detail == "category":
+        # Categorical categories come out in insertion order, so sort the names explicitly
+        totals = expense_df.groupby("Category", observed=True)["Amount"].sum()
+        totals = totals.set_axis(totals.index.astype(str)).sort_index()
+        header = ["Category", "Amount"]
+        columns = [totals.index.astype(str).to_numpy(), format_amounts(totals.to_numpy(), incurrency)]
+    elif detail == "month":
+        months = pd.to_datetime(expense_df["Date"]).dt.to_period("M")
+        totals = expense_df["Amount"].groupby(months.to_numpy(), sort=True).sum()
+        header = ["Month", "Amount"]
+        columns = [totals.index.astype(str).to_numpy(), format_amounts(totals.to_numpy(), incurrency)]
+    elif detail == "rows":
+        header = ["Category", "Amount"]
+        columns = [expense_df["Category"].astype(str).to_numpy(), format_amounts(expense_df["Amount"], incurrency)]
+        if "Date" in expense_df.columns:
+            header = ["Category", "Date", "Amount"]
+            columns.insert(1, format_dates(expense_df["Date"]))
+    else:
+        raise ValueError(f"Unknown report detail: {detail}")
+    return header, np.column_stack(columns).tolist() if len(columns[0]) else []
+
+
+def expense_tables(expense_df, incurrency, detail="rows", chunk_rows=TABLE_CHUNK_ROWS):
+    # Paginated LongTable chunks, each repeating the header row on every page it spans
+    header, rows = expense_table_rows(expense_df, incurrency, detail)
+    return chunked_tables(header, rows, chunk_rows)
+
+
+def chunked_tables(header, rows, chunk_rows=TABLE_CHUNK_ROWS, first_width=200):
+    from reportlab.platypus import LongTable, TableStyle
+
+    style = TableStyle(EXPENSE_TABLE_STYLE)
+    # Fixed widths keep the chunks aligned and spare ReportLab from measuring every cell
+    col_widths = [first_width] + [100] * (len(header) - 1)
+    tables = []
+    for start in range(0, max(len(rows), 1), chunk_rows):
+        table = LongTable([header] + rows[start:start + chunk_rows], colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        tables.append(table)
+    return tables
+
+
+def forecast_table_rows(monthly, burn, incurrency):
+    """Header and body rows for the projected months and for the budget burn of ``ForecastPlan.project()``."""
+    months = pd.to_datetime(monthly["Month"]).dt.strftime("%Y-%m").to_numpy(dtype=str)
+    columns = [months] + [format_amounts(monthly[name], incurrency) for name in ("Expenses", "Income", "Balance")]
+    monthly_rows = np.column_stack(columns).tolist() if len(months) else []
+    used = np.char.add(np.char.mod("%.0f", burn["Used"].to_numpy(dtype=np.float64)), "%")
+    columns = [burn["Category"].astype(str).to_numpy(), format_amounts(burn["Projected"], incurrency),
+               format_amounts(burn["Budget"], incurrency), used]
+    burn_rows = np.column_stack(columns).tolist() if len(burn) else []
+    return (["Month", "Expenses", "Income", "Balance"], monthly_rows), (["Category", "This Month", "Budget", "Used"], burn_rows)
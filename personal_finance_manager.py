@@ -1,41 +1,49 @@
+# Plotly, Matplotlib/Seaborn and ReportLab are imported inside the functions that use
+# them, so a cold start or script reload does not pay for them until they are needed
+# (checked by benchmarks/check_import_time.py)
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pyttsx3
-import plotly.express as px
-from gtts import gTTS
 from io import BytesIO
-import base64
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Spacer, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-
+import os
+import datetime
+from ledger import ExpenseLedger
+from expense_store import ExpenseStore
+from journal import ExpenseJournal
+from figure_cache import PYPLOT_LOCK, FigureCache, chart_png, render_pngs
+from exporter import EXPORT_FORMATS, stream_export
+from pdf_report import REPORT_DETAILS, chunked_tables, expense_tables, forecast_table_rows
+from speech import audio_format, request_speech
+from jobs import JobRunner, job_status
+from importer import STATEMENT_TYPES, import_statement
+from currency import (BASE_CURRENCY, RATES_PATH, RateTable, base_rates, reporting_date_totals, reporting_period,
+                      reporting_total, reporting_view)
+from ranges import month_range
+from timeseries import TREND_GRANULARITIES, downsample, rollup
+from forecast import BUDGETS_PATH, FORECAST_MONTHS, FREQUENCIES, MAX_FORECAST_MONTHS, RECURRING_PATH, ForecastPlan
+from expense_log import LOG_PAGE_ROWS, ExpenseLogIndex
+from categories import chart_categories
+from dedup import DEDUP_POLICIES, resolve_expense
+from metrics import metrics
+
+# How often a pending export, report or audio job is checked, without rerunning the whole page
+JOB_POLL_SECONDS = 1
+
+DB_PATH = os.environ.get("EXPENSE_MANAGER_DB", "expenses.db")
+JOURNAL_PATH = os.environ.get("EXPENSE_MANAGER_JOURNAL", "expenses.journal")
+
+@metrics.timed()
 def export_data(expense_df, export_format):
-    if export_format == "CSV":
-        file_extension = "csv"
-        file_content_type = "text/csv"
-        file_name = "expenses.csv"
-        expense_df.to_csv(file_name, index=False)
-    elif export_format == "Excel":
-        file_extension = "xlsx"
-        file_content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        file_name = "expenses.xlsx"
-        expense_df.to_excel(file_name, index=False)
-    elif export_format == "JSON":
-        file_extension = "json"
-        file_content_type = "application/json"
-        file_name = "expenses.json"
-        expense_df.to_json(file_name, orient="records")
-
-    # Provide download link for the exported file
-    with open(file_name, "rb") as f:
-        file_data = f.read()
-    b64_file = base64.b64encode(file_data).decode("utf-8")
-    download_link = f'<a href="data:{file_content_type};base64,{b64_file}" download="{file_name}">Download {export_format} File</a>'
-    st.markdown(download_link, unsafe_allow_html=True)
-
-def generate_visualizations(expense_df, income=0, total_expenses=0, total_balance=0):
+    # Stream the export into a per-call spooled buffer instead of a shared file on disk, and
+    # return (bytes, file name, content type) for the download button, which needs the whole
+    # file in memory; runs as a background job, whose result the session's JobRunner caches
+    export_file, file_name, file_content_type = stream_export(expense_df, export_format)
+    with export_file:
+        return export_file.read(), file_name, file_content_type
+
+@metrics.timed()
+def generate_visualizations(expense_df, income=0, total_expenses=0, total_balance=0, category_amounts=None):
+    import plotly.express as px
+
     # Bar Graph
     data = pd.DataFrame({
         "Category": ["Total Income", "Total Expenses", "Total Balance"],
@@ -47,13 +55,37 @@ def generate_visualizations(expense_df, income=0, total_expenses=0, total_balanc
                  labels={"Amount": "Amount", "Category": ""},
                  title="Expense Summary")
 
-    category_amounts = expense_df.groupby("Category")["Amount"].sum().reset_index()
+    # Per-category sums come from the ledger aggregates when the caller has them
+    if category_amounts is None:
+        category_amounts = expense_df.groupby("Category", observed=True)["Amount"].sum()
+    # The largest categories get a slice each, the rest are drawn as one "Other" slice
+    category_amounts = chart_categories(category_amounts).reset_index()
     expenses_breakdown_fig = px.pie(category_amounts, values="Amount", names="Category",
                                      title="Expenses Breakdown", hole=0.3)
     
     return expense_summary_fig, expenses_breakdown_fig
 
-def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance):
+@metrics.timed()
+def generate_trend_visualization(date_amounts, projected_amounts=None):
+    import plotly.express as px
+
+    # Ship a bounded number of points, picked to keep the shape of the series
+    expense_trend_df = downsample(date_amounts).reset_index()
+    expense_trend_fig = px.line(expense_trend_df, x="Date", y="Amount",
+                                labels={"Amount": "Total Amount", "Date": "Expense Date"},
+                                title="Expense Trends Over Time")
+    # Forecast recurring spending continues the line, dashed, at the same granularity
+    if projected_amounts is not None and not projected_amounts.empty:
+        projected_df = downsample(projected_amounts).reset_index()
+        expense_trend_fig.add_scatter(x=projected_df["Date"], y=projected_df["Amount"], mode="lines",
+                                      name="Projected", line={"dash": "dash"})
+    return expense_trend_fig
+
+@metrics.timed()
+def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance, category_amounts=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Bar Graph
     bar_chart_fig, ax = plt.subplots(figsize=(8, 6))
     data = {
@@ -68,15 +100,28 @@ def generate_pdfvisualizations(expense_df, income, total_expenses, total_balance
 
     # Pie chart
     pie_chart_fig, ax = plt.subplots(figsize=(8, 6))
-    category_amounts = expense_df.groupby("Category")["Amount"].sum()
-    ax.pie(category_amounts, labels=category_amounts.index, autopct="%1.1f%%", startangle=90)
-    ax.axis("equal")
+    if category_amounts is None:
+        category_amounts = expense_df.groupby("Category", observed=True)["Amount"].sum()
+    category_amounts = chart_categories(category_amounts)
+    if category_amounts.sum() > 0:
+        ax.pie(category_amounts, labels=category_amounts.index, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+    else:
+        # Matplotlib cannot draw a pie of no (or only zero) amounts
+        ax.text(0.5, 0.5, "No expenses", ha="center", va="center", fontsize=14)
+        ax.axis("off")
     plt.title("Expenses Breakdown")
     plt.tight_layout()
 
     return bar_chart_fig, pie_chart_fig
 
-def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig, incurrency):
+@metrics.timed()
+def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig, incurrency,
+                      detail="rows", output_path=None, forecast=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Spacer, Paragraph
+
     # Create PDF document
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
@@ -105,50 +150,115 @@ def create_pdf_report(expense_df, income, total_expenses, total_balance, bar_cha
     content.append(table)
     content.append(Spacer(1, 24))
 
-    # Add bar chart
-    bar_chart_image = BytesIO()
-    bar_chart_fig.savefig(bar_chart_image, format="png")
+    # Add bar chart (a Matplotlib figure or its cached PNG bytes)
+    bar_chart_image = BytesIO(chart_png(bar_chart_fig))
     bar_chart_img = Image(bar_chart_image, width=400, height=300)
     content.append(bar_chart_img)
     content.append(Spacer(1, 12))
 
     # Add pie chart
-    pie_chart_image = BytesIO()
-    pie_chart_fig.savefig(pie_chart_image, format="png")
+    pie_chart_image = BytesIO(chart_png(pie_chart_fig))
     pie_chart_img = Image(pie_chart_image, width=400, height=300)
     content.append(pie_chart_img)
     content.append(Spacer(1, 12))
 
-    # Create a table from the expense DataFrame
-    expense_table_data = [["Category", "Date", "Amount"]]
-    for _, row in expense_df.iterrows():
-        expense_table_data.append([row["Category"], row["Date"].strftime("%Y-%m-%d"), f"{incurrency}{row['Amount']:.2f}"])
-    expense_table = Table(expense_table_data)
-    expense_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), "grey"),
-        ("TEXTCOLOR", (0, 0), (-1, 0), (1, 1, 1)),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-        ("BACKGROUND", (0, 1), (-1, -1), (0.95, 0.95, 0.95)),
-        ("GRID", (0, 0), (-1, -1), 1, (0.75, 0.75, 0.75)),
-    ]))
-    content.append(expense_table)
+    # Projected months and budget burn from the recurring expenses, when the report has a forecast
+    if forecast is not None:
+        _, monthly, burn = forecast
+        (monthly_header, monthly_rows), (burn_header, burn_rows) = forecast_table_rows(monthly, burn, incurrency)
+        content.append(Paragraph("Forecast", styles['Heading2']))
+        content.extend(chunked_tables(monthly_header, monthly_rows, first_width=140))
+        content.append(Spacer(1, 12))
+        if burn_rows:
+            content.append(Paragraph("Budgets", styles['Heading2']))
+            content.extend(chunked_tables(burn_header, burn_rows, first_width=140))
+        content.append(Spacer(1, 24))
+
+    # Create paginated tables from the expense DataFrame (every row, or per category / month totals)
+    content.extend(expense_tables(expense_df, incurrency, detail))
 
     # Build PDF content
     doc.build(content)
 
-    # Save PDF
+    # Return the PDF bytes, saving them only when the caller asks for a file
     pdf_data = buffer.getvalue()
-    with open("expense_report.pdf", "wb") as f:
-        f.write(pdf_data)
-
-def get_download_link(file_path, link_text):
-    with open(file_path, "rb") as f:
-        pdf_data = f.read()
-    b64_pdf = base64.b64encode(pdf_data).decode("utf-8")
-    return f'<a href="data:application/pdf;base64,{b64_pdf}" download="{file_path}" target="_blank">{link_text}</a>'
-
+    if output_path is not None:
+        with open(output_path, "wb") as f:
+            f.write(pdf_data)
+    return pdf_data
+
+
+@metrics.timed()
+def add_expense(ledger, income, expense_category, expense_amount, expense_date, store=None,
+                expense_currency=BASE_CURRENCY, rates=None, incurrency=BASE_CURRENCY, policy="merge"):
+    # Validate against negative values and the balance (both in the reporting currency), handle an
+    # expense already recorded for the category on that date per ``policy`` (see DEDUP_POLICIES),
+    # then upsert on (Category, Date); returns a warning message, or None once the expense is recorded
+    rates = rates if rates is not None else base_rates()
+    try:
+        total_balance = income - reporting_total(ledger, rates, incurrency)
+        resolved = resolve_expense(ledger, policy, expense_category, expense_amount, expense_currency,
+                                   expense_date, rates)
+        category, amount, currency = resolved or (expense_category, expense_amount, expense_currency)
+        # Merged or summed expenses only add their difference to the recorded one
+        existing_index = ledger.lookup(Category=category, Date=expense_date)
+        old_amount = 0.0 if existing_index is None else rates.convert_one(
+            ledger.get(existing_index, "Amount"), ledger.get(existing_index, "Currency"), expense_date, incurrency)
+        converted_amount = rates.convert_one(amount, currency, expense_date, incurrency)
+    except ValueError as error:
+        return str(error)
+    if expense_amount < 0:
+        return "Expense amount cannot be negative."
+    if converted_amount - old_amount > total_balance:
+        return "Expense amount cannot exceed total balance."
+    if not expense_category:
+        return "Expense category is required."
+    if resolved is None:
+        return "An expense for this category already exists on this date."
+    ledger.upsert(Category=category, Amount=amount, Currency=currency, Date=expense_date)
+    if store is not None:
+        store.upsert(category, amount, expense_date, currency)
+    return None
+
+@metrics.timed()
+def build_pdf_report(expense_df, income, total_expenses, total_balance, category_amounts, incurrency, detail,
+                     forecast=None):
+    # Background job: chart PNGs and PDF bytes; only one thread at a time may draw with pyplot
+    with PYPLOT_LOCK:
+        bar_chart_png, pie_chart_png = render_pngs(*generate_pdfvisualizations(
+            expense_df, income, total_expenses, total_balance, category_amounts))
+    return create_pdf_report(expense_df, income, total_expenses, total_balance, bar_chart_png, pie_chart_png,
+                             incurrency, detail, forecast=forecast)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_job(jobs, key, label):
+    # Reruns on its own while the job is pending, then reruns the page to show the result
+    if job_status(jobs.get(key)) in ("queued", "running"):
+        st.info(f"{label}...")
+    else:
+        st.rerun()
+
+def job_result(jobs, key, label):
+    # The finished artifact of a job; None while it is pending (polled above), failed or never submitted
+    future = jobs.get(key)
+    status = job_status(future)
+    if status in ("queued", "running"):
+        poll_job(jobs, key, label)
+    elif status == "failed":
+        st.warning(f"{label} failed: {future.exception()}")
+    elif status == "done":
+        return future.result()
+    return None
+
+def undo_change(journal, store, redo=False):
+    # Undo / Redo callback; it runs before the rerun, so both buttons render with the new journal state
+    for before, after in (journal.redo() if redo else journal.undo()):
+        store.apply_change(before, after)
+    store.flush()
+
+@st.cache_resource
+def get_expense_store(path):
+    return ExpenseStore(path)
 
 def main():
     st.title("Personal Expense Manager")
@@ -167,112 +277,272 @@ def main():
         st.warning("Income cannot be negative.")
         return
 
-    # Initialize or load the expense DataFrame
-    if 'expense_df' not in st.session_state:
-        st.session_state.expense_df = pd.DataFrame(columns=["Category", "Amount", "Date"])
+    # Initialize the expense ledger once per session: the latest journal snapshot plus the changes
+    # journaled after it, or the database when there is no journal yet or it no longer matches the database
+    store = get_expense_store(DB_PATH)
+    if 'ledger' not in st.session_state:
+        st.session_state.journal = ExpenseJournal(JOURNAL_PATH)
+        st.session_state.ledger = st.session_state.journal.restore(
+            ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"]), seed=store.load,
+            totals=store.totals)
+    ledger = st.session_state.ledger
+    journal = st.session_state.journal
+    figure_cache = st.session_state.setdefault("figure_cache", FigureCache())
+    jobs = st.session_state.setdefault("jobs", JobRunner())
+
+    # Dated exchange rates, stored locally and editable here
+    if 'rates' not in st.session_state:
+        st.session_state.rates = RateTable.load(RATES_PATH)
+    rates = st.session_state.rates
+    with st.expander("Exchange Rates"):
+        st.caption(f"Units of each currency per 1 {BASE_CURRENCY}, in effect from the given date.")
+        edited_rates = st.data_editor(rates.rates, num_rows="dynamic", key="rates_editor")
+        if st.button("Save Rates", key="save_rates"):
+            try:
+                st.session_state.rates = rates = RateTable(edited_rates)
+            except ValueError as error:
+                st.warning(str(error))
+            else:
+                rates.save(RATES_PATH)
+                st.success("Exchange rates saved.")
+
+    # Recurring expenses and monthly budgets, stored locally and projected on every rerun
+    if 'forecast_plan' not in st.session_state:
+        st.session_state.forecast_plan = ForecastPlan.load()
+    plan = st.session_state.forecast_plan
+    with st.expander("Recurring Expenses & Budgets"):
+        edited_recurring = st.data_editor(plan.recurring, num_rows="dynamic", key="recurring_editor", column_config={
+            "Currency": st.column_config.SelectboxColumn(options=currency),
+            "Frequency": st.column_config.SelectboxColumn(options=list(FREQUENCIES)),
+            "Start": st.column_config.DateColumn(),
+            "End": st.column_config.DateColumn(),
+        })
+        st.caption("Monthly budget per category.")
+        edited_budgets = st.data_editor(plan.budgets, num_rows="dynamic", key="budgets_editor", column_config={
+            "Currency": st.column_config.SelectboxColumn(options=currency),
+        })
+        if st.button("Save Recurring Expenses & Budgets", key="save_forecast_plan"):
+            try:
+                st.session_state.forecast_plan = plan = ForecastPlan(edited_recurring, edited_budgets)
+            except ValueError as error:
+                st.warning(str(error))
+            else:
+                plan.save(RECURRING_PATH, BUDGETS_PATH)
+                st.success("Recurring expenses and budgets saved.")
+        forecast_months = st.number_input("Forecast months:", min_value=1, max_value=MAX_FORECAST_MONTHS,
+                                          value=FORECAST_MONTHS, step=1, key="forecast_months")
+        forecast_income = st.number_input("Monthly income:", min_value=0.0, value=0.0, step=1.0, key="forecast_income")
 
     # Input for Expenses
     st.header("Expenses")
     expense_category = st.text_input("Enter expense category:", key="expense_category")
     expense_amount = st.number_input("Enter expense amount:", value=0.0, step=1.0, key="expense_amount")
     expense_date = st.date_input("Expense Date:", key="expense_date")
-    add_expense = st.button("Add Expense", key="add_expense")
-
-    total_expenses = st.session_state.expense_df["Amount"].sum()
-    total_balance = income - total_expenses
-
-    # Add expense to the DataFrame if the button is clicked and validate against negative values and balance
-    if add_expense:
-        if expense_amount < 0:
-            st.warning("Expense amount cannot be negative.")
-        elif expense_amount > total_balance:
-            st.warning("Expense amount cannot exceed total balance.")
-        elif not expense_category:
-            st.warning("Expense category is required.")
-        else:
-            # Check if the category already exists on the same date
-            existing_expense_index = st.session_state.expense_df[
-                (st.session_state.expense_df["Category"] == expense_category) &
-                (st.session_state.expense_df["Date"] == expense_date)].index
-
-            if not existing_expense_index.empty:
-                existing_index = existing_expense_index[0]
-                st.session_state.expense_df.loc[existing_index, "Amount"] = expense_amount
+    expense_currency = st.selectbox("Expense currency:", currency, index=currency.index(incurrency), key="expense_currency")
+    dedup_policy = st.selectbox("Duplicate entries:", list(DEDUP_POLICIES), index=list(DEDUP_POLICIES.values()).index("merge"),
+                                key="dedup_policy")
+    add_button = st.button("Add Expense", key="add_expense")
+
+    # Add expense to the ledger if the button is clicked
+    if add_button:
+        warning = add_expense(ledger, income, expense_category, expense_amount, expense_date, store,
+                              expense_currency, rates, incurrency, DEDUP_POLICIES[dedup_policy])
+        if warning:
+            st.warning(warning)
+        store.flush()
+
+    # Bulk import of bank statements, upserted on (Category, Date) with the same duplicate policy as single expenses
+    with st.expander("Import Bank Statement"):
+        statement = st.file_uploader("Upload a CSV, Excel or OFX statement:", type=STATEMENT_TYPES, key="statement_file")
+        if st.button("Import Statement", key="import_statement") and statement is not None:
+            try:
+                # Upserted chunk by chunk, undone in one step
+                with journal.batch():
+                    imported, combined, rejected = import_statement(
+                        ledger, statement, statement.name, income, store, currency=expense_currency, rates=rates,
+                        incurrency=incurrency, policy=DEDUP_POLICIES[dedup_policy])
+            except ValueError as error:
+                st.warning(str(error))
             else:
-                new_expense = pd.DataFrame({"Category": [expense_category], "Amount": [expense_amount], "Date": [expense_date]})
-                st.session_state.expense_df = pd.concat([st.session_state.expense_df, new_expense], ignore_index=True)
-
-    # Sort the expense DataFrame by date
-    st.session_state.expense_df.sort_values(by="Date", inplace=True)
-
-    total_expenses = st.session_state.expense_df["Amount"].sum()
+                st.success(f"Imported {imported} expenses from {statement.name}.")
+                if combined:
+                    st.info(f"{combined} rows were combined with a later row for the same category and date.")
+                if not rejected.empty:
+                    st.warning(f"{len(rejected)} rows were rejected.")
+                    st.dataframe(rejected.head(1000))
+
+    # Step back and forth through journaled changes; the database follows the ledger
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        st.button("Undo", key="undo", disabled=not journal.can_undo, on_click=undo_change, args=(journal, store))
+    with redo_col:
+        st.button("Redo", key="redo", disabled=not journal.can_redo, on_click=undo_change, args=(journal, store, True))
+
+    # View of the ledger sorted by date, converted into the selected currency; totals come from
+    # the ledger aggregates when no conversion is needed, otherwise from one vectorized pass
+    view_key = (ledger.version, incurrency, rates.key)
+    try:
+        with metrics.span("view", len(ledger)):
+            expense_df, total_expenses, category_amounts, date_amounts = figure_cache.get_or_build(
+                ("view",) + view_key, lambda: reporting_view(ledger, rates, incurrency, sort_by="Date"))
+    except ValueError as error:
+        # Fall back to the base currency, which only needs rates for expenses recorded in other currencies
+        if incurrency == BASE_CURRENCY:
+            st.warning(f"{error} Add it under Exchange Rates.")
+            return
+        st.warning(f"{error} Add it under Exchange Rates; amounts are shown in {BASE_CURRENCY} meanwhile.")
+        incurrency = BASE_CURRENCY
+        view_key = (ledger.version, incurrency, rates.key)
+        try:
+            expense_df, total_expenses, category_amounts, date_amounts = figure_cache.get_or_build(
+                ("view",) + view_key, lambda: reporting_view(ledger, rates, incurrency, sort_by="Date"))
+        except ValueError:
+            return
     total_balance = income - total_expenses
 
+    # Projection of the recurring expenses from today, in the selected currency; a few milliseconds even for
+    # years of hundreds of items, so it is not cached, but it is part of the trend and report keys
+    forecast = None
+    forecast_key = (plan.key, forecast_months, forecast_income, datetime.date.today())
+    if len(plan) or len(plan.budgets):
+        try:
+            with metrics.span("forecast", len(plan)):
+                month_spent = reporting_period(ledger, expense_df, incurrency, *month_range(datetime.date.today()))[2]
+                forecast = plan.project(rates, incurrency, total_balance, forecast_income, forecast_months,
+                                        spent=month_spent)
+        except ValueError as error:
+            st.warning(f"{error} Add it under Exchange Rates.")
+
+    # Figures are only rebuilt when the ledger, the income or the currency changes
+    if not ledger.empty:
+        expense_summary_fig, expenses_breakdown_fig = figure_cache.get_or_build(
+            ("plotly", income) + view_key,
+            lambda: generate_visualizations(expense_df, income, total_expenses, total_balance, category_amounts))
+
      # Create dashboard layout with columns
     col1, col2 = st.columns(2)
 
     with col1:
         # Display Expense Log
         st.header("Expense Log")
-        if not st.session_state.expense_df.empty:
-            st.text(st.session_state.expense_df.to_string(index=False))
+        if not ledger.empty:
+            # Filters are served from indexes built once per view; only the visible page is formatted
+            log_index = figure_cache.get_or_build(("log",) + view_key, lambda: ExpenseLogIndex(expense_df))
+            category_prefix = st.text_input("Category starts with:", key="log_category")
+            date_range = st.date_input("Date range:", value=(), key="log_dates")
+            min_amount, max_amount = st.columns(2)
+            with min_amount:
+                min_amount = st.number_input("Min amount:", value=None, key="log_min_amount")
+            with max_amount:
+                max_amount = st.number_input("Max amount:", value=None, key="log_max_amount")
+            with metrics.span("log_search", len(expense_df)):
+                rows = log_index.search(category_prefix, (tuple(date_range) + (None, None))[:2], (min_amount, max_amount))
+
+            pages = max(-(-len(rows) // LOG_PAGE_ROWS), 1)
+            if st.session_state.get("log_page", 1) > pages:
+                st.session_state.log_page = pages
+            page = st.number_input("Page:", min_value=1, max_value=pages, value=1, step=1, key="log_page")
+            st.dataframe(log_index.page(rows, page), hide_index=True)
+            st.caption(f"{len(rows)} expenses, page {page} of {pages}")
 
     with col2:
         # Visualization: Expenses Breakdown - Pie Chart
         st.header("Expenses Breakdown")
-        if not st.session_state.expense_df.empty:
-            _, expenses_breakdown_fig = generate_visualizations(st.session_state.expense_df)
+        if not ledger.empty:
             st.plotly_chart(expenses_breakdown_fig)
 
         # Visualization: Expense Summary - Bar Chart
     st.header("Expense Summary")
-    if not st.session_state.expense_df.empty:
-        expense_summary_fig, _ = generate_visualizations(st.session_state.expense_df, income, total_expenses, total_balance)
+    if not ledger.empty:
         st.plotly_chart(expense_summary_fig)
     
     # Expense Trends Over Time
     st.header("Expense Trends Over Time")
-    if not st.session_state.expense_df.empty:
-        expense_trend_df = st.session_state.expense_df.groupby("Date")["Amount"].sum().reset_index()
-        expense_trend_fig = px.line(expense_trend_df, x="Date", y="Amount",
-                                    labels={"Amount": "Total Amount", "Date": "Expense Date"},
-                                    title="Expense Trends Over Time")
+    if not ledger.empty:
+        granularity = st.selectbox("Granularity:", list(TREND_GRANULARITIES), key="trend_granularity")
+        expense_trend_fig = figure_cache.get_or_build(
+            ("trend", granularity, forecast is not None) + forecast_key + view_key,
+            lambda: generate_trend_visualization(
+                reporting_date_totals(ledger, date_amounts, incurrency, TREND_GRANULARITIES[granularity]),
+                None if forecast is None else rollup(forecast[0], TREND_GRANULARITIES[granularity])))
         st.plotly_chart(expense_trend_fig)
 
+    # Forecast balance and budget burn from the recurring expenses
+    if forecast is not None:
+        st.header("Forecast")
+        _, monthly, burn = forecast
+        st.write(f"Projected Balance after {len(monthly)} months: {incurrency} {monthly['Balance'].iloc[-1]:.2f}")
+        st.dataframe(monthly, hide_index=True)
+        if not burn.empty:
+            st.dataframe(burn, hide_index=True)
+
     # Display Total Balance section
     st.header("Total Balance")
+    # The totals, exports and PDF report cover the chosen period: a slice of the date-sorted view,
+    # with the sums answered by the ledger's range index
+    period = st.date_input("Period:", value=(), key="period")
+    period = (tuple(period) + (None, None))[:2]
+    if period != (None, None):
+        expense_df, total_expenses, category_amounts = reporting_period(ledger, expense_df, incurrency, *period)
+        total_balance = income - total_expenses
+    view_key = view_key + period
     st.write(f"Total Income: {incurrency} {income:.2f}")
     st.write(f"Total Expenses: {incurrency} {total_expenses:.2f}")
     st.write(f"Total Balance: {incurrency} {total_balance:.2f}")
     
-    export_format = st.selectbox("Select export format:", ["CSV", "Excel", "JSON"])
-    export_button = st.button("Export Data")
-    
-    if export_button:
-        if not st.session_state.expense_df.empty:
-            export_data(st.session_state.expense_df, export_format)
-            st.success(f"Data exported as {export_format} successfully!")
+    # Exports, audio and reports build in the background, keyed like the figures; the page stays
+    # usable meanwhile, and a repeat click joins the running job or reuses its finished artifact
+    export_format = st.selectbox("Select export format:", list(EXPORT_FORMATS))
+    export_key = ("export", export_format) + view_key
+    if st.button("Export Data"):
+        if expense_df.empty:
+            st.info("No expenses in the selected period to export.")
+        else:
+            jobs.submit(export_key, export_data, expense_df, export_format)
+    export = job_result(jobs, export_key, f"Exporting {export_format}")
+    if export is not None:
+        export_bytes, file_name, file_content_type = export
+        st.success(f"Data exported as {export_format} successfully!")
+        st.download_button(f"Download {export_format} File", export_bytes, file_name=file_name, mime=file_content_type)
 
     colm1, colm2= st.columns(2)
     with colm1:
+        speech_key = ("speech",) + view_key
         explain_expenses = st.button("Explain Expenses", key="Explain_Expenses")
         if explain_expenses:
             text_to_speech = "Here's the breakdown of your expenses:\n"
-            category_amounts = st.session_state.expense_df.groupby("Category")["Amount"].sum().reset_index()
-            for _, row in category_amounts.iterrows():
-                text_to_speech += f"For {row['Category']}, you spent {incurrency} {row['Amount']:.2f}\n"
+            for category, amount in category_amounts.items():
+                text_to_speech += f"For {category}, you spent {incurrency} {amount:.2f}\n"
     
             text_to_speech += f"Your total expenses are {incurrency} {total_expenses:.2f}"
-            tts = gTTS(text_to_speech)
-            tts.save("expenses.mp3")
-            st.audio("expenses.mp3")
+            # Synthesized offline on the speech worker and cached on disk by text
+            jobs.track(speech_key, request_speech(text_to_speech))
+        audio_path = job_result(jobs, speech_key, "Preparing audio")
+        if audio_path is not None:
+            st.audio(audio_path, format=audio_format(audio_path))
 
     with colm2:
-        if st.button("Generate PDF Report") and not st.session_state.expense_df.empty:
-            bar_chart_fig, pie_chart_fig = generate_pdfvisualizations(st.session_state.expense_df, income, total_expenses, total_balance)
-            create_pdf_report(st.session_state.expense_df, income, total_expenses, total_balance, bar_chart_fig, pie_chart_fig, incurrency)
+        report_detail = st.selectbox("Report detail:", list(REPORT_DETAILS), key="report_detail")
+        pdf_key = ("pdf", income, report_detail, forecast is not None) + forecast_key + view_key
+        if st.button("Generate PDF Report"):
+            if expense_df.empty:
+                st.info("No expenses in the selected period to report.")
+            else:
+                jobs.submit(pdf_key, build_pdf_report, expense_df, income, total_expenses, total_balance,
+                            category_amounts, incurrency, REPORT_DETAILS[report_detail], forecast)
+        pdf_data = job_result(jobs, pdf_key, "Building PDF report")
+        if pdf_data is not None:
             st.success("PDF Report generated successfully!")
-            st.markdown(get_download_link("expense_report.pdf", "Download PDF Report"), unsafe_allow_html=True)
+            st.download_button("Download PDF Report", pdf_data, file_name="expense_report.pdf", mime="application/pdf")
+
+    # Rolling stage timings, when FINANCE_METRICS_PATH switches the recorder on
+    if metrics.enabled:
+        with st.expander("Stage Timings"):
+            st.dataframe(pd.DataFrame.from_dict(metrics.summary(), orient="index"))
 
 if __name__ == "__main__":
-    main()
+    try:
+        with metrics.span("rerun"):
+            main()
+    finally:
+        metrics.flush()
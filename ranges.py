@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from ledger import DAY_OFFSET, NAT_DAYS, pack_keys
+
+# Changes buffered before they are merged into the sorted prefix sums: at least MERGE_EVERY,
+# and one per MERGE_FRACTION of the entries held, so a merge's linear cost is spread over many changes
+MERGE_EVERY = 1024
+MERGE_FRACTION = 64
+
+
+def _day(value, default):
+    # Day number of a date bound; None stands for an open end
+    if value is None:
+        return default
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def month_range(month):
+    # First and last day of a calendar month given as "YYYY-MM", a date or a datetime64
+    first = np.datetime64(month, "M")
+    return first.astype("datetime64[D]").astype(object), ((first + 1).astype("datetime64[D]") - 1).astype(object)
+
+
+def _merge(keys, sums, counts, new_keys, new_sums, new_counts):
+    # Sorted distinct keys with their sums and expense counts, after adding a batch; keys whose count drops
+    # to zero are dropped (a key of zero-amount expenses is kept)
+    order = np.argsort(new_keys, kind="stable")
+    new_keys, new_sums, new_counts = new_keys[order], new_sums[order], new_counts[order]
+    positions = np.searchsorted(keys, new_keys)
+    keys = np.insert(keys, positions, new_keys)
+    sums = np.insert(sums, positions, new_sums)
+    counts = np.insert(counts, positions, new_counts)
+    if len(keys):
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        keys, sums, counts = keys[starts], np.add.reduceat(sums, starts), np.add.reduceat(counts, starts)
+    kept = counts != 0
+    return keys[kept], sums[kept], counts[kept]
+
+
+class ExpenseRanges:
+    """Date-sorted prefix sums of amounts, overall and per category, for period totals.
+
+    Amounts are integer cents keyed by category code and day number, like the
+    rest of ExpenseAggregates. Two sorted arrays are kept: the distinct days
+    with their running total, and the distinct (category, day) pairs with
+    theirs and a running expense count, so a category with only zero-amount
+    expenses in a period still shows up. The total between two dates is then two binary searches into the
+    first, and the per-category breakdown two binary searches per category
+    into the second, whatever the number of expenses.
+
+    Additions and removals go to a buffer that queries scan as well; once it
+    holds a fixed fraction of the index size it is sorted and merged into
+    the arrays in one linear pass, so keeping the index current costs
+    amortized O(1) array work per change and a rebuild is never needed.
+    ``decode`` turns category codes back into names.
+    """
+
+    def __init__(self, decode=None):
+        self._decode = decode
+        self._days = np.empty(0, dtype=np.int64)
+        self._day_cents = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._key_cents = np.empty(0, dtype=np.int64)
+        self._day_counts = np.empty(0, dtype=np.int64)
+        self._key_counts = np.empty(0, dtype=np.int64)
+        self._day_prefix = np.zeros(1, dtype=np.int64)
+        self._key_prefix = np.zeros(1, dtype=np.int64)
+        self._key_count_prefix = np.zeros(1, dtype=np.int64)
+        self._codes = np.empty(0, dtype=np.int64)
+        # Buffered (cents, code, day, count) changes, one per column; count is +1 for an addition, -1 for a removal
+        self._pending = np.empty((4, MERGE_EVERY), dtype=np.int64)
+        self._pending_count = 0
+
+    def __len__(self):
+        # Distinct (category, day) pairs held, counting buffered changes as well
+        return len(self._keys) + self._pending_count
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in (
+            self._days, self._day_cents, self._keys, self._key_cents, self._day_counts, self._key_counts,
+            self._day_prefix, self._key_prefix, self._key_count_prefix, self._codes, self._pending))
+
+    def _change(self, cents, code, day, count):
+        self._pending[:, self._pending_count] = cents, code, day, count
+        self._pending_count += 1
+        if self._pending_count == self._pending.shape[1]:
+            self._flush()
+
+    def add(self, cents, code, day):
+        self._change(cents, code, day, 1)
+
+    def remove(self, cents, code, day):
+        self._change(-cents, code, day, -1)
+
+    def add_many(self, cents, codes, days):
+        cents = np.asarray(cents, dtype=np.int64)
+        self._flush(cents, np.asarray(codes, dtype=np.int64), np.asarray(days, dtype=np.int64),
+                    np.ones(len(cents), dtype=np.int64))
+
+    def _pending_arrays(self):
+        return tuple(self._pending[:, :self._pending_count])
+
+    def _flush(self, cents=None, codes=None, days=None, counts=None):
+        # Merge the buffer, plus an optional batch, into the sorted arrays and rebuild the prefix sums
+        buffered = self._pending_arrays()
+        self._pending_count = 0
+        if cents is not None:
+            buffered = tuple(np.concatenate(pair) for pair in zip(buffered, (cents, codes, days, counts)))
+        cents, codes, days, counts = buffered
+        # NaT days never fall in a period
+        dated = days != NAT_DAYS
+        cents, codes, days, counts = cents[dated], codes[dated], days[dated], counts[dated]
+        if len(cents):
+            self._merge_batch(cents, codes, days, counts)
+        self._pending = np.empty((4, max(MERGE_EVERY, len(self._keys) // MERGE_FRACTION)), dtype=np.int64)
+
+    def _merge_batch(self, cents, codes, days, counts):
+        self._days, self._day_cents, self._day_counts = _merge(
+            self._days, self._day_cents, self._day_counts, days, cents, counts)
+        self._keys, self._key_cents, self._key_counts = _merge(
+            self._keys, self._key_cents, self._key_counts, pack_keys(codes, days), cents, counts)
+        self._day_prefix = np.concatenate(([0], np.cumsum(self._day_cents)))
+        self._key_prefix = np.concatenate(([0], np.cumsum(self._key_cents)))
+        self._key_count_prefix = np.concatenate(([0], np.cumsum(self._key_counts)))
+        codes = self._keys >> 32
+        self._codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))] if len(codes) else codes
+
+    def _bounds(self, start, end):
+        # Half-open day range [low, high) for inclusive date bounds
+        return _day(start, -DAY_OFFSET), _day(end, DAY_OFFSET - 2) + 1
+
+    def total(self, start=None, end=None):
+        """Sum of the amounts dated ``start`` to ``end`` (inclusive; None leaves that end open)."""
+        low, high = self._bounds(start, end)
+        lo, hi = np.searchsorted(self._days, [low, high])
+        cents = int(self._day_prefix[hi] - self._day_prefix[lo])
+        if self._pending_count:
+            pending_cents, _, pending_days, _ = self._pending_arrays()
+            cents += int(pending_cents[(pending_days >= low) & (pending_days < high)].sum())
+        return cents / 100
+
+    def category_totals(self, start=None, end=None):
+        """Per-category sums for the period, as a Series indexed by category and sorted by it."""
+        low, high = self._bounds(start, end)
+        codes = self._codes
+        highs = np.searchsorted(self._keys, pack_keys(codes, high))
+        lows = np.searchsorted(self._keys, pack_keys(codes, low))
+        cents = self._key_prefix[highs] - self._key_prefix[lows]
+        counts = self._key_count_prefix[highs] - self._key_count_prefix[lows]
+        if self._pending_count:
+            pending_cents, pending_codes, pending_days, pending_counts = self._pending_arrays()
+            inside = (pending_days >= low) & (pending_days < high)
+            codes = np.union1d(self._codes, pending_codes[inside])
+            positions = np.searchsorted(codes, self._codes)
+            pending_positions = np.searchsorted(codes, pending_codes[inside])
+            merged_cents = np.zeros(len(codes), dtype=np.int64)
+            merged_counts = np.zeros(len(codes), dtype=np.int64)
+            merged_cents[positions], merged_counts[positions] = cents, counts
+            np.add.at(merged_cents, pending_positions, pending_cents[inside])
+            np.add.at(merged_counts, pending_positions, pending_counts[inside])
+            cents, counts = merged_cents, merged_counts
+        # Categories with expenses in the period, zero-amount ones included
+        kept = counts != 0
+        codes, cents = codes[kept], cents[kept]
+        names = self._decode("Category", codes) if self._decode is not None else codes
+        index = pd.Index(names, name="Category")
+        return pd.Series(cents / 100, index=index, name="Amount", dtype="float64").sort_index()
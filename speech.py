@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import metrics
+
+# Synthesized audio is cached on disk by a hash of the text and voice settings
+AUDIO_CACHE_DIR = os.environ.get("FINANCE_AUDIO_CACHE", ".audio_cache")
+DEFAULT_VOICE = {"rate": 170, "volume": 1.0, "voice": None}
+
+# pyttsx3 engines are not thread-safe, so a single worker synthesizes in the background
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speech")
+_in_flight = {}
+_lock = threading.RLock()
+
+
+def speech_key(text, voice=DEFAULT_VOICE):
+    payload = json.dumps({"text": text, **voice}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def audio_format(path):
+    return "audio/wav" if path.endswith(".wav") else "audio/mpeg"
+
+
+def _cached_path(key):
+    for extension in ("wav", "mp3"):
+        path = os.path.join(AUDIO_CACHE_DIR, f"{key}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _synthesize_offline(text, voice, path):
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty("rate", voice["rate"])
+    engine.setProperty("volume", voice["volume"])
+    if voice["voice"] is not None:
+        engine.setProperty("voice", voice["voice"])
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+    engine.stop()
+    if not os.path.exists(path):
+        raise RuntimeError("pyttsx3 did not produce any audio.")
+
+
+def _synthesize_online(text, path):
+    from gtts import gTTS
+
+    gTTS(text).save(path)
+
+
+@metrics.timed("speech")
+def _synthesize(text, voice, key):
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    # Write under a temporary name and rename, so readers never see a partial file
+    for extension, synthesize in (("wav", lambda path: _synthesize_offline(text, voice, path)),
+                                  ("mp3", lambda path: _synthesize_online(text, path))):
+        partial = os.path.join(AUDIO_CACHE_DIR, f"{key}.partial.{extension}")
+        try:
+            synthesize(partial)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            # No local speech engine (e.g. eSpeak missing): fall back to Google TTS
+            if extension == "mp3":
+                raise
+            continue
+        path = os.path.join(AUDIO_CACHE_DIR, f"{key}.{extension}")
+        os.replace(partial, path)
+        return path
+
+
+def _forget(key):
+    with _lock:
+        _in_flight.pop(key, None)
+
+
+def request_speech(text, voice=DEFAULT_VOICE):
+    """Return a Future resolving to the path of an audio file speaking ``text``.
+
+    Cached audio resolves immediately. Otherwise synthesis runs on the
+    background worker, and identical requests made while it is running share
+    the same Future instead of synthesizing again.
+    """
+    key = speech_key(text, voice)
+    path = _cached_path(key)
+    if path is not None:
+        future = Future()
+        future.set_result(path)
+        return future
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _executor.submit(_synthesize, text, voice, key)
+            _in_flight[key] = future
+            future.add_done_callback(lambda _: _forget(key))
+    return future
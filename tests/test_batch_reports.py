@@ -0,0 +1,40 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from batch_reports import render_job
+from expense_store import ExpenseStore
+
+APP = "personal_finance_manager"
+
+
+def render(db_path, out_dir, month=None):
+    return render_job(APP, str(db_path), str(out_dir), 1000.0, "USD", "rows", ["CSV"], month)
+
+
+def test_missing_database_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        render(tmp_path / "typo.db", tmp_path)
+    assert not (tmp_path / "typo.db").exists()
+
+
+@pytest.mark.parametrize("month", [None, "2024-01"])
+def test_report_without_expenses(tmp_path, month):
+    # An empty database, and a month with no expenses in a database that has some
+    store = ExpenseStore(str(tmp_path / "ledger.db"))
+    if month is not None:
+        store.upsert("Food", 10.0, datetime.date(2024, 5, 3))
+    store.close()
+
+    result = render(tmp_path / "ledger.db", tmp_path, month)
+
+    assert result["rows"] == 0
+    assert all(os.path.getsize(path) > 0 for path in result["outputs"])
@@ -0,0 +1,42 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import ExpenseLedger
+
+DAY = datetime.date(2024, 3, 1)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+
+
+def dated_ledger():
+    return ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"])
+
+
+def test_match_follows_the_ledger():
+    ledger = dated_ledger()
+    ledger.extend(Category=["Food", "food "], Amount=[1.0, 2.0], Currency=["USD", "USD"], Date=[DAY, NEXT_DAY])
+    fingerprints = ledger.fingerprints
+
+    assert fingerprints.match(" FOOD", DAY) == "Food"
+    assert fingerprints.match("Food", NEXT_DAY) == "food "
+    assert fingerprints.match("Rent", DAY) is None
+
+    ledger.delete(ledger.lookup(Category="Food", Date=DAY))
+    ledger.upsert(Category="Rent", Amount=3.0, Currency="USD", Date=DAY)
+    assert fingerprints.match("food", DAY) is None
+    assert fingerprints.match_many(["food", "RENT", "Other"], [NEXT_DAY, DAY, DAY]).tolist() == ["food ", "Rent", None]
+
+
+def test_fingerprints_cost_memory_per_category():
+    ledger = dated_ledger()
+    rows = 2000
+    ledger.extend(Category=np.array([f"Category {i % 20}" for i in range(rows)], dtype=object),
+                  Amount=np.ones(rows), Currency=np.full(rows, "USD", dtype=object),
+                  Date=[DAY + datetime.timedelta(days=i // 20) for i in range(rows)])
+    ledger.fingerprints.match("Category 0", DAY)
+
+    assert ledger.memory_usage()["fingerprints"] < 100 * 20
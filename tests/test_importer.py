@@ -0,0 +1,24 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importer import import_statement
+from ledger import ExpenseLedger
+
+STATEMENT = b"Category,Amount,Date\nfood,5,2024-01-01\nFood,7,2024-01-01\nbus,3,2024-01-02\n"
+
+
+@pytest.mark.parametrize("policy, amount", [("merge", 7.0), ("sum", 12.0)])
+def test_rows_combined_within_a_statement_are_not_counted_twice(policy, amount):
+    ledger = ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"])
+
+    imported, combined, rejected = import_statement(ledger, io.BytesIO(STATEMENT), "statement.csv", 1000.0,
+                                                    policy=policy)
+
+    assert (imported, combined, len(rejected)) == (2, 1, 0)
+    assert len(ledger) == imported
+    assert ledger.get(ledger.lookup(Category="food", Date="2024-01-01"), "Amount") == amount
@@ -0,0 +1,48 @@
+import os
+import sys
+import threading
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobRunner, job_status
+
+
+def run_with_timeout(function, seconds=10):
+    # Fails the test instead of hanging it when the runner deadlocks
+    worker = threading.Thread(target=function, daemon=True)
+    worker.start()
+    worker.join(seconds)
+    assert not worker.is_alive(), "JobRunner deadlocked"
+
+
+def test_track_finished_future():
+    runner = JobRunner()
+    future = Future()
+    future.set_result(b"audio")
+
+    run_with_timeout(lambda: runner.track("speech", future))
+
+    assert runner.get("speech") is future
+    assert job_status(runner.get("speech")) == "done"
+
+
+def test_trivial_submits():
+    runner = JobRunner()
+
+    def submit_all():
+        futures = [runner.submit(("export", i), lambda i=i: i) for i in range(2000)]
+        assert [future.result() for future in futures] == list(range(2000))
+
+    run_with_timeout(submit_all)
+
+
+def test_finished_artifacts_evicted_beyond_max_bytes():
+    runner = JobRunner(max_bytes=10)
+    for key in ("a", "b", "c"):
+        future = Future()
+        future.set_result(b"12345")
+        run_with_timeout(lambda: runner.track(key, future))
+
+    assert runner.get("a") is None
+    assert runner.get("b") is not None and runner.get("c") is not None
@@ -0,0 +1,97 @@
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expense_store import ExpenseStore
+from journal import ExpenseJournal
+from ledger import ExpenseLedger
+
+DATE = datetime.date(2024, 1, 1)
+
+
+def new_ledger():
+    return ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"])
+
+
+def add(ledger, store, category, amount):
+    ledger.upsert(Category=category, Amount=amount, Currency="USD", Date=DATE)
+    store.upsert(category, amount, DATE, "USD")
+    store.flush()
+
+
+def categories(ledger):
+    return sorted(ledger.column("Category").tolist())
+
+
+def test_snapshot_keeps_other_sessions_changes(tmp_path):
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    path = str(tmp_path / "expenses.journal")
+    first = ExpenseJournal(path, snapshot_every=3)
+    second = ExpenseJournal(path, snapshot_every=3)
+    ledger_a = first.restore(new_ledger(), seed=store.load, totals=store.totals)
+    ledger_b = second.restore(new_ledger(), seed=store.load, totals=store.totals)
+
+    add(ledger_b, store, "FromB", 5.0)
+    # Three changes in session A take its snapshot, after B appended to the journal
+    for category in ("A1", "A2", "A3"):
+        add(ledger_a, store, category, 1.0)
+    first.close()
+    second.close()
+
+    assert os.path.getsize(path) == 0
+    restored = ExpenseJournal(path).restore(new_ledger(), seed=store.load, totals=store.totals)
+    assert categories(restored) == ["A1", "A2", "A3", "FromB"]
+
+
+def test_restore_reseeds_when_database_differs(tmp_path):
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    path = str(tmp_path / "expenses.journal")
+    journal = ExpenseJournal(path)
+    ledger = journal.restore(new_ledger(), seed=store.load, totals=store.totals)
+    add(ledger, store, "Food", 10.0)
+    journal.close()
+    # Written to the database behind the journal's back
+    store.upsert("Rent", 500.0, DATE, "USD")
+
+    restored = ExpenseJournal(path).restore(new_ledger(), seed=store.load, totals=store.totals)
+    assert categories(restored) == ["Food", "Rent"]
+    assert restored.aggregates.total == 510.0
+
+
+def test_update_is_one_undo_step(tmp_path):
+    import finance_manager
+    from currency import RateTable
+
+    store = ExpenseStore(str(tmp_path / "finance.db"))
+    journal = ExpenseJournal(str(tmp_path / "finance.journal"))
+    ledger = journal.restore(ExpenseLedger(columns=["Category", "Amount", "Currency"], key=["Category"]),
+                             seed=store.load, totals=store.totals)
+    assert finance_manager.add_expense(ledger, 1000.0, "Rent", 100.0, store) is None
+    assert finance_manager.update_expense(ledger, 1000.0, "Rent", 90.0, store, expense_currency="EUR",
+                                          rates=RateTable.load()) is None
+
+    journal.undo()
+    assert ledger.records(ledger.lookup(Category="Rent")) == [{"Category": "Rent", "Amount": 100.0, "Currency": "USD"}]
+
+
+def test_chunked_import_is_one_undo_step(tmp_path):
+    import io
+
+    from importer import import_statement
+
+    store = ExpenseStore(str(tmp_path / "expenses.db"))
+    journal = ExpenseJournal(str(tmp_path / "expenses.journal"))
+    ledger = journal.restore(new_ledger(), seed=store.load, totals=store.totals)
+    add(ledger, store, "Kept", 1.0)
+    lines = ["Category,Amount,Date"] + [f"Item {i},1,2024-01-{i % 28 + 1:02d}" for i in range(50)]
+    statement = io.BytesIO("\n".join(lines).encode())
+    with journal.batch():
+        imported, _, _ = import_statement(ledger, statement, "statement.csv", 1000.0, store, chunk_rows=20)
+    assert imported == 50
+
+    journal.undo()
+    assert categories(ledger) == ["Kept"]
+    journal.redo()
+    assert len(ledger) == 51
@@ -0,0 +1,64 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger as ledger_module
+from ledger import ExpenseLedger
+
+DAY = datetime.date(2024, 3, 1)
+
+
+def dated_ledger():
+    return ExpenseLedger(columns=["Category", "Amount", "Currency", "Date"], key=["Category", "Date"])
+
+
+def test_key_index_follows_updates_and_deletes(monkeypatch):
+    # Merge the index's pending inserts often, so lookups go through both its dict and its sorted arrays
+    monkeypatch.setattr(ledger_module, "INDEX_MERGE_EVERY", 2)
+    ledger = dated_ledger()
+    ledger.extend(Category=["Food", "Rent", "Food"], Amount=[1.0, 2.0, 3.0], Currency=["USD"] * 3,
+                  Date=[DAY, DAY, DAY + datetime.timedelta(days=1)])
+    for day in range(2, 6):
+        ledger.upsert(Category="Travel", Amount=float(day), Currency="USD", Date=DAY + datetime.timedelta(days=day))
+
+    ledger.delete(ledger.lookup(Category="Rent", Date=DAY))
+    ledger.set(ledger.lookup(Category="Food", Date=DAY), "Category", "Groceries")
+    ledger.upsert(Category="Rent", Amount=9.0, Currency="USD", Date=DAY)
+
+    assert ledger.lookup(Category="Food", Date=DAY) is None
+    assert ledger.get(ledger.lookup(Category="Groceries", Date=DAY), "Amount") == 1.0
+    assert ledger.get(ledger.lookup(Category="Rent", Date=DAY), "Amount") == 9.0
+    rows = ledger.lookup_many(Category=["Rent", "Food", "Unknown", "Travel"],
+                              Date=[DAY, DAY, DAY, DAY + datetime.timedelta(days=5)])
+    assert rows[2] == -1 and rows[1] == -1
+    assert ledger.take(rows[[0, 3]], "Amount").tolist() == [9.0, 5.0]
+
+
+def test_duplicate_keys_in_batch_are_rejected():
+    ledger = ExpenseLedger(columns=["Category", "Amount", "Currency"], key=["Category"])
+    ledger.append(Category="Rent", Amount=1.0, Currency="USD")
+    for categories in (["Food", "Food"], ["Food", "Rent"]):
+        try:
+            ledger.extend(Category=categories, Amount=[1.0, 2.0], Currency=["USD", "USD"])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{categories} should be rejected")
+    assert len(ledger) == 1
+
+
+def test_memory_usage_counts_index_and_aggregates():
+    ledger = dated_ledger()
+    rows = 1000
+    ledger.extend(Category=np.array([f"Category {i % 50}" for i in range(rows)], dtype=object),
+                  Amount=np.ones(rows), Currency=np.full(rows, "USD", dtype=object),
+                  Date=[DAY + datetime.timedelta(days=i // 50) for i in range(rows)])
+    usage = ledger.memory_usage()
+
+    assert {"index", "groups", "ranges", "fingerprints"} <= set(usage)
+    # One packed int64 key and one row position per expense, plus the empty dict of pending inserts
+    assert 16 * rows <= usage["index"] < 17 * rows
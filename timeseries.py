@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import DATE_ROLLUPS
+
+# Granularities offered for the trend chart -> aggregate holding them
+TREND_GRANULARITIES = {
+    "Day": "Date",
+    "Week": "Week",
+    "Month": "Month",
+}
+
+# Most points the trend chart sends to the browser, whatever the history length
+MAX_TREND_POINTS = 500
+
+
+def rollup(date_amounts, granularity):
+    # Week / month totals derived from per-day totals; costs O(days), not O(expenses)
+    if granularity == "Date" or date_amounts.empty:
+        return date_amounts
+    days = pd.to_datetime(date_amounts.index).to_numpy(dtype="datetime64[D]").view(np.int64)
+    periods = DATE_ROLLUPS[granularity](days).view("datetime64[D]")
+    totals = date_amounts.groupby(periods, sort=True).sum()
+    return totals.rename_axis("Date").rename("Amount")
+
+
+def lttb(x, y, threshold=MAX_TREND_POINTS):
+    """Indices of at most ``threshold`` points that preserve the shape of (x, y).
+
+    Largest-Triangle-Three-Buckets: the first and last points are kept, the
+    rest is split into equal buckets and from each bucket the point forming
+    the largest triangle with the previously kept point and the average of the
+    next bucket is kept. ``x`` must be sorted and numeric.
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        following = slice(end, edges[bucket + 2] if bucket + 2 < len(edges) else count)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample(date_amounts, threshold=MAX_TREND_POINTS):
+    # Bounded, shape-preserving subset of a date-indexed series for plotting
+    if len(date_amounts) <= threshold:
+        return date_amounts
+    x = pd.to_datetime(date_amounts.index.to_series()).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return date_amounts.iloc[lttb(x, date_amounts.to_numpy(), threshold)]